@@ -0,0 +1,146 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+from PIL import Image, ImageTk
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'spotipi', 'album_art')
+
+
+def pick_image_url(images, target):
+    # Spotify lists each album cover in several sizes (usually 640, 300 and
+    # 64px). Take the smallest one that still covers the target size.
+    sized = [image for image in images if image.get('width') and image.get('height')]
+    if not sized:
+        return images[0]['url'] if images else None
+
+    adequate = [image for image in sized if min(image['width'], image['height']) >= target]
+    if adequate:
+        return min(adequate, key=lambda image: image['width'] * image['height'])['url']
+    return max(sized, key=lambda image: image['width'] * image['height'])['url']
+
+
+def decode_and_resize(data, size):
+    image = Image.open(io.BytesIO(data))
+    # For JPEGs, let libjpeg decode at a reduced scale (1/2, 1/4, 1/8) that is
+    # still at least the target size, so there is less to decode and resample
+    image.draft('RGB', size)
+    return image.convert('RGB').resize(size, Image.LANCZOS)
+
+
+class AlbumArtCache:
+    # Album art keyed by image URL: a bounded in-memory LRU of ready-to-use
+    # PhotoImages in front of an on-disk cache of already-resized JPEGs.
+    def __init__(self, size=(250, 250), memory_items=32,
+                 cache_dir=DEFAULT_CACHE_DIR, max_disk_bytes=50 * 1024 * 1024, session=None):
+        self.size = size
+        # A shared keep-alive session saves a TLS handshake per image
+        self.session = session or requests
+        self.memory_items = memory_items
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.disk_lock = threading.Lock()
+        self.downloads = 0
+        self.bytes_downloaded = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get(self, url):
+        # Memory only, never touches disk or network so it is safe on the UI thread
+        with self.lock:
+            photo = self.memory.get(url)
+            if photo is not None:
+                self.memory.move_to_end(url)
+            return photo
+
+    def fetch_image(self, url):
+        # Disk, then network. Runs on a worker thread and returns a PIL image;
+        # turn it into a PhotoImage on the UI thread with make_photo()
+        image = self.load_from_disk(url)
+        if image is None:
+            image = self.download(url)
+            self.save_to_disk(url, image)
+        return image
+
+    def make_photo(self, url, image):
+        photo = self.get(url)
+        if photo is None:
+            photo = ImageTk.PhotoImage(image)
+            self.remember(url, photo)
+        return photo
+
+    def remember(self, url, photo):
+        with self.lock:
+            self.memory[url] = photo
+            self.memory.move_to_end(url)
+            while len(self.memory) > self.memory_items:
+                self.memory.popitem(last=False)
+
+    def download(self, url):
+        response = self.session.get(url, timeout=10)
+        response.raise_for_status()
+        with self.lock:
+            self.downloads += 1
+            self.bytes_downloaded += len(response.content)
+        return decode_and_resize(response.content, self.size)
+
+    def disk_path(self, url):
+        key = hashlib.sha1(f"{url}:{self.size[0]}x{self.size[1]}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.jpg")
+
+    def load_from_disk(self, url):
+        path = self.disk_path(url)
+        try:
+            image = Image.open(path)
+            image.load()
+        except (OSError, ValueError):
+            return None
+
+        # Bump the mtime so eviction treats this entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return image
+
+    def save_to_disk(self, url, image):
+        path = self.disk_path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            image.save(tmp_path, 'JPEG', quality=90)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing album art cache: {e}")
+            return
+
+        self.evict_disk()
+
+    def evict_disk(self):
+        with self.disk_lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.jpg'):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
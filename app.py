@@ -1,70 +1,194 @@
-from flask import Flask, redirect, request, jsonify
+import startup  # Imported first so startup timing starts at process start
+from flask import Flask, Response, redirect, request, jsonify, stream_with_context
 import requests
-import base64
 import random
 import string
 import threading
+import time
 import os
 import webbrowser
 import tkinter_app
-import requests
+from sdk_device import sdk_device
+from http_session import connection_stats
+from events import EventBroadcaster, device_fields, track_fields
+from playback_state import is_playing_of, position_ms_at
 
 app = Flask(__name__)
 
+# Pushes the Tk app's playback state to browsers, so they never poll Spotify
+broadcaster = EventBroadcaster(tkinter_app.playback_state)
+
+# Upper bound on |steps| for /api/next, so one request can't queue an
+# unbounded run of skip calls against the Spotify API
+MAX_API_STEPS = 20
+
 client_id = os.getenv('SPOTIPY_CLIENT_ID')
 client_secret = os.getenv('SPOTIPY_CLIENT_SECRET')
 redirect_uri = os.getenv('SPOTIPY_REDIRECT_URI')
 
 print(client_id, client_secret, redirect_uri)
-response = requests.get('https://accounts.spotify.com')
-print(response.status_code)
+
+def check_connectivity():
+    try:
+        response = tkinter_app.http_session.get('https://accounts.spotify.com', timeout=10)
+        print(response.status_code)
+    except requests.RequestException as e:
+        print(f"Cannot reach accounts.spotify.com: {e}")
+
+# Only informational, so it must not hold up the window
+threading.Thread(target=check_connectivity, daemon=True).start()
 
 def generate_random_string(length):
     return ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(length))
 
 @app.route('/')
 def index():
-    state = generate_random_string(16)
-    scope = 'user-read-private user-read-email user-modify-playback-state streaming'
+    # The Tk app's token manager already holds a token, no need to log in again
+    if tkinter_app.token_manager.current():
+        return redirect('/player')
 
-    auth_url = (
-        'https://accounts.spotify.com/authorize?'
-        f'response_type=code&client_id={client_id}&scope={scope}&redirect_uri={redirect_uri}&state={state}'
-    )
-    return redirect(auth_url)
+    state = generate_random_string(16)
+    return redirect(tkinter_app.sp_oauth.get_authorize_url(state=state))
 
 @app.route('/callback')
 def callback():
     code = request.args.get('code')
-    state = request.args.get('state')
-
-    auth_str = f'{client_id}:{client_secret}'
-    b64_auth_str = base64.urlsafe_b64encode(auth_str.encode()).decode()
-
-    token_url = 'https://accounts.spotify.com/api/token'
-    payload = {
-        'code': code,
-        'redirect_uri': redirect_uri,
-        'grant_type': 'authorization_code'
-    }
-    headers = {
-        'Authorization': f'Basic {b64_auth_str}',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-
-    response = requests.post(token_url, data=payload, headers=headers)
-    response_data = response.json()
-
-    access_token = response_data.get('access_token')
-    if access_token:
-        return redirect(f'http://localhost:8888/player?access_token={access_token}')
-    else:
-        return jsonify(response_data), 400
+    if not code:
+        return jsonify({'error': request.args.get('error', 'missing code')}), 400
+
+    try:
+        tkinter_app.token_manager.exchange_code(code)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    return redirect('/player')
+
+@app.route('/token')
+def token():
+    # Current token for the web player; refreshed in the background, so this never blocks
+    token_info = tkinter_app.token_manager.current()
+    if not token_info:
+        return jsonify({'error': 'not authorized'}), 401
+    return jsonify({'access_token': token_info['access_token'], 'expires_at': token_info.get('expires_at')})
+
+@app.route('/stats/connections')
+def connections():
+    # Per-host connections opened vs requests sent on the shared keep-alive session
+    return jsonify(connection_stats(tkinter_app.http_session))
+
+@app.route('/stats/requests')
+def request_stats():
+    # API calls sent, GETs answered by an identical call in flight, and 429s,
+    # plus the calls made by the play/add commands by endpoint
+    stats = tkinter_app.governor.stats()
+    stats['commands'] = dict(tkinter_app.commands.call_counts)
+    return jsonify(stats)
+
+@app.route('/events')
+def events():
+    response = Response(stream_with_context(broadcaster.stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# Local control API for scripts and home automation. Reads come from the Tk
+# app's in-memory state and never call Spotify; writes go through the same
+# transport queue as Page2's buttons. Nothing here touches Tk widgets, the
+# pages pick up the results through the shared playback state.
+
+def json_required():
+    # Writes must be sent as application/json. A page open in the kiosk's
+    # browser can't do that cross-origin without a CORS preflight, which this
+    # app never grants, so it can't play, pause or skip behind the user's back.
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json'}), 415
+    return None
+
+def track_row(row):
+    uri, name, artist = row
+    return {'uri': uri, 'name': name, 'artist': artist}
+
+@app.route('/api/state')
+def api_state():
+    snapshot, fetched_at = tkinter_app.playback_state.current_with_time()
+    expected = tkinter_app.transport.expected_playing()
+    return jsonify({
+        'track': track_fields(snapshot),
+        'is_playing': expected if expected is not None else is_playing_of(snapshot),
+        'device': device_fields(snapshot),
+        'progress_ms': int(position_ms_at(snapshot, fetched_at, time.monotonic())) if snapshot else None,
+    })
+
+@app.route('/api/play', methods=['POST'])
+def api_play():
+    rejected = json_required()
+    if rejected:
+        return rejected
+    tkinter_app.transport.set_playing(True)
+    return jsonify({'is_playing': True}), 202
+
+@app.route('/api/pause', methods=['POST'])
+def api_pause():
+    rejected = json_required()
+    if rejected:
+        return rejected
+    tkinter_app.transport.set_playing(False)
+    return jsonify({'is_playing': False}), 202
+
+@app.route('/api/next', methods=['POST'])
+def api_next():
+    rejected = json_required()
+    if rejected:
+        return rejected
+    # Optional {"steps": n}; negative steps go back
+    steps = (request.get_json(silent=True) or {}).get('steps', 1)
+    if not isinstance(steps, int) or isinstance(steps, bool) or steps == 0:
+        return jsonify({'error': 'steps must be a non-zero integer'}), 400
+    if abs(steps) > MAX_API_STEPS:
+        return jsonify({'error': f'steps must be between -{MAX_API_STEPS} and {MAX_API_STEPS}'}), 400
+    return jsonify({'pending_steps': tkinter_app.transport.skip(steps)}), 202
+
+@app.route('/api/playlists')
+def api_playlists():
+    playlists = tkinter_app.playlist_repository.cached()
+    return jsonify([{'id': playlist['id'], 'name': playlist['name']} for playlist in playlists])
+
+@app.route('/api/search')
+def api_search():
+    # Local library hits, plus remote results only if this query was already
+    # searched from Page4 recently
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 50))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    remote = tkinter_app.remote_search_cache.get(query) or []
+    return jsonify({
+        'query': query,
+        'local': [track_row(row) for row in tkinter_app.search_index.search(query, limit=limit)],
+        'remote': [track_row(row) for row in remote[:limit]],
+    })
+
+@app.route('/sdk/ready', methods=['POST'])
+def sdk_ready():
+    device_id = (request.get_json(silent=True) or {}).get('device_id')
+    if not device_id:
+        return jsonify({'error': 'device_id is required'}), 400
+    sdk_device.mark_ready(device_id)
+    return jsonify({'device_id': device_id})
+
+@app.route('/sdk/not_ready', methods=['POST'])
+def sdk_not_ready():
+    device_id = (request.get_json(silent=True) or {}).get('device_id')
+    if device_id:
+        sdk_device.mark_not_ready(device_id)
+    return jsonify({'device_id': device_id})
 
 @app.route('/player')
 def player():
-    access_token = request.args.get('access_token')
-    return f'''
+    return '''
     <!DOCTYPE html>
     <html>
     <head>
@@ -74,72 +198,123 @@ def player():
         <h1>Spotify Web Playback SDK Quick Start</h1>
         <button id="togglePlay">Toggle Play</button>
 
+        <div id="nowPlaying">
+            <img id="albumArt" width="150" height="150" alt="" hidden>
+            <p id="trackName">Nothing playing</p>
+            <p id="trackArtists"></p>
+        </div>
+
         <script src="https://sdk.scdn.co/spotify-player.js"></script>
         <script>
-            window.onSpotifyWebPlaybackSDKReady = () => {{
-                const token = '{access_token}';  // Use the access token from the query parameter
-                const player = new Spotify.Player({{
+            // Current track pushed by the app; the page makes no API calls for it
+            const nowPlaying = { track: null, is_playing: false };
+            const events = new EventSource('/events');
+
+            function applyState(event) {
+                Object.assign(nowPlaying, JSON.parse(event.data));
+                const track = nowPlaying.track;
+                document.getElementById('trackName').textContent =
+                    track ? (nowPlaying.is_playing ? '' : 'Paused: ') + track.name : 'Nothing playing';
+                document.getElementById('trackArtists').textContent = track ? track.artists.join(', ') : '';
+                const art = document.getElementById('albumArt');
+                if (track && track.image) {
+                    if (art.src !== track.image) {
+                        art.src = track.image;
+                    }
+                    art.hidden = false;
+                } else {
+                    art.hidden = true;
+                }
+            }
+
+            events.addEventListener('snapshot', applyState);
+            events.addEventListener('change', applyState);
+
+            // Always ask the app for the current token, it keeps it refreshed
+            function getToken() {
+                return fetch('/token')
+                    .then(response => response.json())
+                    .then(data => data.access_token);
+            }
+
+            window.onSpotifyWebPlaybackSDKReady = () => {
+                const player = new Spotify.Player({
                     name: 'Web Playback SDK Quick Start Player',
-                    getOAuthToken: cb => {{ cb(token); }},
+                    getOAuthToken: cb => { getToken().then(cb); },
                     volume: 0.1
-                }});
+                });
 
-                player.addListener('ready', (event) => {{
+                player.addListener('ready', (event) => {
                     const device_id = event.device_id;
                     console.log('Ready with Device ID', device_id);
-                    transferPlayback(token, device_id);
-                }});
+                    reportDevice('/sdk/ready', device_id);
+                    getToken().then(token => transferPlayback(token, device_id));
+                });
 
-                player.addListener('not_ready', (device_id) => {{
+                player.addListener('not_ready', (event) => {
+                    const device_id = event.device_id;
                     console.log('Device ID has gone offline', device_id);
-                }});
+                    reportDevice('/sdk/not_ready', device_id);
+                });
 
-                player.addListener('initialization_error', (message) => {{
+                player.addListener('initialization_error', (message) => {
                     console.error('Initialization Error:', message);
-                }});
+                });
 
-                player.addListener('authentication_error', (message) => {{
+                player.addListener('authentication_error', (message) => {
                     console.error('Authentication Error:', message);
-                }});
+                });
 
-                player.addListener('account_error', (message) => {{
+                player.addListener('account_error', (message) => {
                     console.error('Account Error:', message);
-                }});
+                });
 
-                document.getElementById('togglePlay').onclick = function() {{
+                document.getElementById('togglePlay').onclick = function() {
                     player.togglePlay();
-                }};
+                };
 
-                player.connect().then(success => {{
-                    if (success) {{
+                player.connect().then(success => {
+                    if (success) {
                         console.log('The Web Playback SDK successfully connected to Spotify!');
-                    }}
-                }});
+                    }
+                });
+
+                // Let the kiosk app know the moment the device exists
+                function reportDevice(path, device_id) {
+                    fetch(path, {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ device_id: device_id }),
+                    })
+                    .catch(error => {
+                        console.error('Error reporting device to the app:', error);
+                    });
+                }
 
-                function transferPlayback(token, device_id) {{
-                    fetch('https://api.spotify.com/v1/me/player', {{
+                function transferPlayback(token, device_id) {
+                    fetch('https://api.spotify.com/v1/me/player', {
                         method: 'PUT',
-                        headers: {{
+                        headers: {
                             'Authorization': 'Bearer ' + token,
                             'Content-Type': 'application/json',
-                        }},
-                        body: JSON.stringify({{
+                        },
+                        body: JSON.stringify({
                             device_ids: [device_id],
                             play: true,
-                        }}),
-                    }})
-                    .then(response => {{
-                        if (response.ok) {{
+                        }),
+                    })
+                    .then(response => {
+                        if (response.ok) {
                             console.log('Playback transferred successfully');
-                        }} else {{
+                        } else {
                             console.error('Failed to transfer playback');
-                        }}
-                    }})
-                    .catch(error => {{
+                        }
+                    })
+                    .catch(error => {
                         console.error('Error transferring playback:', error);
-                    }});
-                }}
-            }};
+                    });
+                }
+            };
         </script>
     </body>
     </html>
@@ -154,5 +329,7 @@ if __name__ == '__main__':
     flask_thread.daemon = True  # Allow thread to be killed when main program exits
     flask_thread.start()
 
-    # Start the Tkinter app in the main thread
-    tkinter_app.startTkinter()
+    # Start the Tkinter app in the main thread. Without a cached token, log in
+    # through this Flask app's /callback rather than spotipy's own redirect
+    # server, which would need the same port.
+    tkinter_app.startTkinter(login=tkinter_app.launch_web_page)
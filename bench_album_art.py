@@ -0,0 +1,52 @@
+import io
+import time
+
+from PIL import Image
+
+from album_art import decode_and_resize, pick_image_url
+
+# Compares the album art pipeline per track change: the old path (always the
+# 640px cover, full decode) against picking the smallest adequate cover and
+# decoding with JPEG draft mode. Covers are synthetic noise JPEGs so the byte
+# counts are in the same range as Spotify's real ones.
+
+TARGET = (250, 250)
+ITERATIONS = 50
+
+
+def make_cover(side):
+    image = Image.effect_noise((side, side), 64).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def old_pipeline(data, size):
+    image = Image.open(io.BytesIO(data))
+    return image.resize(size, Image.LANCZOS)
+
+
+def time_pipeline(pipeline, data):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        pipeline(data, TARGET)
+    return (time.perf_counter() - start) * 1000 / ITERATIONS
+
+
+def main():
+    covers = {side: make_cover(side) for side in (640, 300, 64)}
+    images = [{'url': side, 'width': side, 'height': side} for side in (640, 300, 64)]
+
+    picked = pick_image_url(images, TARGET[0])
+
+    old_ms = time_pipeline(old_pipeline, covers[640])
+    draft_only_ms = time_pipeline(decode_and_resize, covers[640])
+    new_ms = time_pipeline(decode_and_resize, covers[picked])
+
+    print(f"old: 640px, full decode      {len(covers[640]):>7} bytes  {old_ms:6.2f} ms")
+    print(f"640px + draft decode         {len(covers[640]):>7} bytes  {draft_only_ms:6.2f} ms")
+    print(f"new: {picked}px + draft decode    {len(covers[picked]):>7} bytes  {new_ms:6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import time
+from collections import Counter
+
+from commands import PlaybackCommands
+from devices import DeviceRegistry
+from sdk_device import SDK_PLAYER_NAME, SdkDevice
+
+# API calls per tap, old Page4 code paths vs PlaybackCommands, against a fake
+# Spotify client that counts calls and takes API_LATENCY for each. Tap->music
+# is the time until start_playback returns. The old SDK path's 5 s sleep for
+# the browser is left out so only the API round-trips are compared.
+
+API_LATENCY = 0.15
+TRACK_URI = 'spotify:track:bench'
+SDK_DEVICE_ID = 'sdk-device'
+
+
+class FakeSpotify:
+    def __init__(self, playing=True):
+        self.playing = playing
+        self.calls = Counter()
+        self.music_at = None
+
+    def call(self, name):
+        self.calls[name] += 1
+        time.sleep(API_LATENCY)
+
+    def current_playback(self):
+        self.call('current_playback')
+        return {'is_playing': self.playing, 'device': {'id': 'speaker'}}
+
+    def start_playback(self, **kwargs):
+        self.call('start_playback')
+        self.music_at = time.perf_counter()
+
+    def track(self, uri):
+        self.call('track')
+        return {'name': 'Song', 'artists': [{'name': 'Artist'}]}
+
+    def devices(self):
+        self.call('devices')
+        return {'devices': [{'id': SDK_DEVICE_ID, 'name': SDK_PLAYER_NAME}]}
+
+    def transfer_playback(self, device_id):
+        self.call('transfer_playback')
+
+    def current_user(self):
+        self.call('current_user')
+        return {'id': 'me'}
+
+    def user_playlist_add_tracks(self, **kwargs):
+        self.call('user_playlist_add_tracks')
+
+    def playlist_add_items(self, playlist_id, items):
+        self.call('playlist_add_items')
+
+
+class FakePlaybackState:
+    def __init__(self, playing):
+        self.snapshot = {'is_playing': playing, 'device': {'id': 'speaker'}}
+
+    def current(self):
+        return self.snapshot
+
+    def poll_now(self):
+        pass
+
+
+def old_play_track(sp):
+    # Page4.play_track before PlaybackCommands
+    current_track = sp.current_playback()
+    if not current_track or not current_track['is_playing']:
+        device_id = next(device['id'] for device in sp.devices()['devices'] if device['name'] == SDK_PLAYER_NAME)
+        sp.transfer_playback(device_id)
+        sp.start_playback(uris=[TRACK_URI])
+    else:
+        sp.start_playback(uris=[TRACK_URI])
+    sp.track(TRACK_URI)
+
+
+def old_add_to_playlist(sp):
+    sp.user_playlist_add_tracks(user=sp.current_user()['id'], playlist_id='list', tracks=[TRACK_URI])
+
+
+def make_commands(sp, playing, sdk_reported):
+    sdk_device = SdkDevice()
+    if sdk_reported:
+        sdk_device.mark_ready(SDK_DEVICE_ID)
+    return PlaybackCommands(sp, FakePlaybackState(playing), sdk_device, DeviceRegistry(sp))
+
+
+def new_play_track(commands, playing):
+    # What Page4.play_track does now: play on the active device, or wait for
+    # the SDK player and play there
+    if playing:
+        commands.play_track(TRACK_URI)
+    else:
+        commands.play_on_sdk(TRACK_URI, timeout=0)
+
+
+def measure(action):
+    sp, run = action()
+    start = time.perf_counter()
+    run()
+    music_ms = ((sp.music_at or time.perf_counter()) - start) * 1000
+    return sum(sp.calls.values()), music_ms, dict(sp.calls)
+
+
+def scenario(playing=True, sdk_reported=True, old=True, add=False):
+    def action():
+        sp = FakeSpotify(playing)
+        if old:
+            return sp, (lambda: old_add_to_playlist(sp)) if add else (lambda: old_play_track(sp))
+        commands = make_commands(sp, playing, sdk_reported)
+        if add:
+            return sp, lambda: commands.add_to_playlist('list', TRACK_URI)
+        return sp, lambda: new_play_track(commands, playing)
+    return action
+
+
+def main():
+    rows = [
+        ("tap track, device active", scenario(True, old=True), scenario(True, old=False)),
+        ("tap track, SDK reported ready", scenario(False, old=True), scenario(False, True, old=False)),
+        ("tap track, SDK found by name", scenario(False, old=True), scenario(False, False, old=False)),
+        ("add to playlist", scenario(old=True, add=True), scenario(old=False, add=True)),
+    ]
+    for label, old_action, new_action in rows:
+        old_calls, old_ms, _ = measure(old_action)
+        new_calls, new_ms, new_counts = measure(new_action)
+        print(f"{label:<30} old {old_calls} calls {old_ms:6.0f} ms   new {new_calls} calls {new_ms:6.0f} ms  {new_counts}")
+
+
+if __name__ == '__main__':
+    main()
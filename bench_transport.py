@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import Counter
+
+from transport import TransportQueue
+
+# Press-to-repaint latency and API calls when mashing Page2's skip button,
+# old path vs the transport queue. Spotify is simulated with a fixed per-call
+# latency; "repaint" is the point where the button handler has returned with
+# the label updated, which is when Tk can draw the next frame.
+
+API_LATENCY = 0.15
+PRESSES = 5
+PRESS_INTERVAL = 0.08
+
+
+class FakeCommands:
+    def __init__(self):
+        self.call_counts = Counter()
+
+    def call(self, name, *args, **kwargs):
+        self.call_counts[name] += 1
+        time.sleep(API_LATENCY)
+        return {'queue': [{'uri': f'spotify:track:{i}'} for i in range(20)]}
+
+
+class FakePlaybackState:
+    def __init__(self):
+        self.snapshot = {'is_playing': True, 'context': {'uri': 'spotify:playlist:bench'}}
+        self.polled = threading.Event()
+
+    def subscribe(self, callback):
+        callback(self.snapshot, {'is_playing'})
+
+    def current(self):
+        return self.snapshot
+
+    def poll_now(self):
+        self.polled.set()
+
+
+def old_path():
+    # Each press ran next_track and then current_playback on the Tk thread,
+    # so later presses waited in the event queue behind earlier ones
+    commands = FakeCommands()
+    latencies = []
+    busy_until = time.perf_counter()
+    start = time.perf_counter()
+    for i in range(PRESSES):
+        pressed = start + i * PRESS_INTERVAL
+        now = time.perf_counter()
+        if now < pressed:
+            time.sleep(pressed - now)
+        commands.call('next_track')
+        commands.call('current_playback')
+        busy_until = time.perf_counter()
+        latencies.append(busy_until - pressed)
+    return latencies, sum(commands.call_counts.values()), busy_until - start
+
+
+def new_path():
+    commands = FakeCommands()
+    playback_state = FakePlaybackState()
+    transport = TransportQueue(commands, playback_state)
+    transport.start()
+    label = {}
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(PRESSES):
+        pressed = start + i * PRESS_INTERVAL
+        now = time.perf_counter()
+        if now < pressed:
+            time.sleep(pressed - now)
+        pressed = time.perf_counter()
+        label['text'] = f"Skipping ahead {transport.skip(1)}..."
+        latencies.append(time.perf_counter() - pressed)
+
+    # Pause then play again before anything is sent: nets out to nothing
+    transport.set_playing(False)
+    transport.set_playing(True)
+
+    # The queue polls once the batch has been sent
+    playback_state.polled.wait()
+    return latencies, sum(commands.call_counts.values()), dict(commands.call_counts)
+
+
+def main():
+    old_latencies, old_calls, old_total = old_path()
+    new_latencies, new_calls, new_counts = new_path()
+
+    print(f"old: press->repaint max {max(old_latencies) * 1000:7.1f} ms  "
+          f"mean {sum(old_latencies) / len(old_latencies) * 1000:7.1f} ms  {old_calls} API calls")
+    print(f"new: press->repaint max {max(new_latencies) * 1000:7.3f} ms  "
+          f"mean {sum(new_latencies) / len(new_latencies) * 1000:7.3f} ms  {new_calls} API calls {new_counts}")
+
+
+if __name__ == '__main__':
+    main()
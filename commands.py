@@ -0,0 +1,63 @@
+from collections import Counter
+
+from governor import user_initiated
+from sdk_device import SDK_PLAYER_NAME
+
+
+class PlaybackCommands:
+    # Playback actions shared by the pages. Decisions use the last-known
+    # playback snapshot rather than a fresh current_playback() call, and track
+    # names come from the row that was tapped, so playing a track costs a
+    # single start_playback request. call_counts records every API call made.
+    def __init__(self, sp, playback_state, sdk_device, device_registry):
+        self.sp = sp
+        self.playback_state = playback_state
+        self.sdk_device = sdk_device
+        self.device_registry = device_registry
+        self.call_counts = Counter()
+
+    def call(self, name, *args, **kwargs):
+        self.call_counts[name] += 1
+        with user_initiated():
+            return getattr(self.sp, name)(*args, **kwargs)
+
+    def active_device_id(self):
+        snapshot = self.playback_state.current()
+        if snapshot and snapshot.get('device'):
+            return snapshot['device'].get('id')
+        return None
+
+    def play_track(self, track_uri, context_uri=None, device_id=None):
+        # start_playback with a device_id also moves playback there, so no
+        # separate transfer_playback call is needed
+        if context_uri:
+            self.call('start_playback', device_id=device_id, context_uri=context_uri, offset={"uri": track_uri})
+        else:
+            self.call('start_playback', device_id=device_id, uris=[track_uri])
+        self.playback_state.poll_now()
+
+    def seek(self, position_ms):
+        self.call('seek_track', int(position_ms))
+        self.playback_state.poll_now()
+
+    def transfer_playback(self, device_id):
+        self.call('transfer_playback', device_id)
+        self.device_registry.invalidate()
+        self.playback_state.poll_now()
+
+    def play_on_sdk(self, track_uri, timeout=20, is_cancelled=lambda: False):
+        # Blocks a worker, never the UI, until the /player page reports the SDK
+        # device ready. If it never reports (e.g. the page was opened outside
+        # this process), look the device up by name before giving up.
+        device_id = self.sdk_device.wait(timeout, is_cancelled)
+        if device_id is None and not is_cancelled():
+            device_id = self.device_registry.find_by_name(SDK_PLAYER_NAME)
+        if device_id is None:
+            return False
+
+        self.play_track(track_uri, device_id=device_id)
+        return True
+
+    def add_to_playlist(self, playlist_id, track_uri):
+        # playlist_add_items doesn't need the user id, so no current_user() lookup
+        self.call('playlist_add_items', playlist_id, [track_uri])
@@ -0,0 +1,83 @@
+import threading
+
+
+class DeviceRegistry:
+    # Spotify Connect devices, kept warm by a background refresh and indexed by
+    # id and by name. invalidate() asks for a refresh right away, e.g. after
+    # transfer_playback or when the SDK player goes offline. Subscribers get
+    # the full device list whenever it changes.
+    def __init__(self, sp, interval=60):
+        self.sp = sp
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.devices = []
+        self.by_id = {}
+        self.by_name = {}
+        self.subscribers = []
+        self.wake_event = threading.Event()
+        self.thread = None
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+            devices = list(self.devices)
+        if devices:
+            callback(devices)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def invalidate(self):
+        self.wake_event.set()
+
+    def run(self):
+        while True:
+            self.refresh()
+            self.wake_event.wait(self.interval)
+            self.wake_event.clear()
+
+    def refresh(self):
+        try:
+            devices = self.sp.devices().get('devices', [])
+        except Exception as e:
+            print(f"Error fetching devices: {e}")
+            return self.list()
+
+        with self.lock:
+            changed = devices != self.devices
+            self.devices = devices
+            self.by_id = {device['id']: device for device in devices if device.get('id')}
+            self.by_name = {device['name']: device for device in devices if device.get('name')}
+            subscribers = list(self.subscribers)
+
+        if changed:
+            for callback in subscribers:
+                try:
+                    callback(list(devices))
+                except Exception as e:
+                    print(f"Error in device subscriber: {e}")
+        return list(devices)
+
+    def list(self):
+        with self.lock:
+            return list(self.devices)
+
+    def get(self, device_id):
+        with self.lock:
+            return self.by_id.get(device_id)
+
+    def find_by_name(self, name, refresh_if_missing=True):
+        with self.lock:
+            device = self.by_name.get(name)
+        if device is None and refresh_if_missing:
+            self.refresh()
+            with self.lock:
+                device = self.by_name.get(name)
+        return device['id'] if device else None
@@ -0,0 +1,116 @@
+import itertools
+import json
+import queue
+import threading
+
+from album_art import pick_image_url
+from playback_state import device_id_of, is_playing_of
+
+
+def track_fields(snapshot):
+    item = (snapshot or {}).get('item')
+    if not item:
+        return None
+    images = (item.get('album') or {}).get('images') or item.get('images') or []
+    return {
+        'id': item.get('id'),
+        'uri': item.get('uri'),
+        'name': item.get('name'),
+        'artists': [artist.get('name') for artist in item.get('artists') or []],
+        'album': (item.get('album') or {}).get('name'),
+        'image': pick_image_url(images, 300),
+        'duration_ms': item.get('duration_ms'),
+    }
+
+
+def device_fields(snapshot):
+    device = (snapshot or {}).get('device')
+    if not device_id_of(snapshot):
+        return None
+    return {'id': device.get('id'), 'name': device.get('name')}
+
+
+def snapshot_diff(snapshot, changes):
+    # Only the fields that changed, plus the position so clients can
+    # extrapolate progress locally
+    diff = {'progress_ms': (snapshot or {}).get('progress_ms')}
+    if 'track' in changes:
+        diff['track'] = track_fields(snapshot)
+    if 'is_playing' in changes:
+        diff['is_playing'] = is_playing_of(snapshot)
+    if 'device' in changes:
+        diff['device'] = device_fields(snapshot)
+    return diff
+
+
+def format_event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventBroadcaster:
+    # Fans the shared playback state out to any number of Server-Sent Events
+    # clients. Each client gets the full state when it connects and then
+    # only what changed. A comment line every `heartbeat` seconds keeps idle
+    # connections (and proxies) open and lets a dead client be noticed. A
+    # client that falls `max_backlog` events behind is dropped; EventSource
+    # reconnects and starts again from a full snapshot.
+    def __init__(self, playback_state, heartbeat=15, max_backlog=32):
+        self.playback_state = playback_state
+        self.heartbeat = heartbeat
+        self.max_backlog = max_backlog
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.ids = itertools.count(1)
+        playback_state.subscribe(self.on_playback_change)
+
+    def on_playback_change(self, snapshot, changes):
+        message = format_event('change', snapshot_diff(snapshot, changes), next(self.ids))
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                self.disconnect(client)
+
+    def disconnect(self, client):
+        with self.lock:
+            self.clients.discard(client)
+        # Wake the client's generator so it notices and ends the stream
+        try:
+            client.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def client_count(self):
+        with self.lock:
+            return len(self.clients)
+
+    def stream(self):
+        client = queue.Queue(maxsize=self.max_backlog)
+        with self.lock:
+            self.clients.add(client)
+        try:
+            snapshot = self.playback_state.current()
+            yield "retry: 3000\n\n"
+            yield format_event('snapshot', snapshot_diff(snapshot, {'track', 'is_playing', 'device'}))
+            while True:
+                with self.lock:
+                    if client not in self.clients:
+                        return
+                try:
+                    message = client.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            with self.lock:
+                self.clients.discard(client)
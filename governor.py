@@ -0,0 +1,164 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import spotipy
+from spotipy.exceptions import SpotifyException
+
+_context = threading.local()
+
+
+@contextmanager
+def user_initiated():
+    # Requests made inside this block are user actions (taps, searches) and
+    # go ahead of background polling and syncing
+    previous = getattr(_context, 'user', False)
+    _context.user = True
+    try:
+        yield
+    finally:
+        _context.user = previous
+
+
+def is_user_initiated():
+    return getattr(_context, 'user', False)
+
+
+def is_rate_limited(error):
+    # spotipy also raises a header-less 429 ("Max Retries") when urllib3 has
+    # given up on repeated 5xx responses; only a real 429 response has headers
+    return error.http_status == 429 and bool(error.headers)
+
+
+def retry_after_of(error, default):
+    try:
+        return max(float(error.headers.get('Retry-After', default)), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+class InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class RequestGovernor:
+    # Every Spotify API call in the process goes through here.
+    #  - A token bucket (rate per second, up to burst) is the global budget.
+    #    Background requests leave user_reserve tokens untouched and wait
+    #    while a user request is queued, so a tap never sits behind polling.
+    #  - A 429 stops all requests until its Retry-After has passed, then the
+    #    call is retried, up to max_retries times.
+    #  - Identical GETs already in flight share one request; every caller gets
+    #    the same (shared, so read-only) response.
+    def __init__(self, rate=5.0, burst=30, user_reserve=10, max_retries=3, default_retry_after=5):
+        self.rate = rate
+        self.burst = burst
+        self.user_reserve = user_reserve
+        self.max_retries = max_retries
+        self.default_retry_after = default_retry_after
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self.user_waiting = 0
+        self.condition = threading.Condition()
+        self.in_flight = {}
+        self.in_flight_lock = threading.Lock()
+        self.requests = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, user):
+        floor = 1 if user else 1 + self.user_reserve
+        with self.condition:
+            if user:
+                self.user_waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.refill(now)
+                    if now >= self.blocked_until and self.tokens >= floor and (user or not self.user_waiting):
+                        self.tokens -= 1
+                        self.requests += 1
+                        return
+                    wait = max(self.blocked_until - now, (floor - self.tokens) / self.rate, 0.01)
+                    self.condition.wait(wait)
+            finally:
+                if user:
+                    self.user_waiting -= 1
+                    self.condition.notify_all()
+
+    def back_off(self, seconds):
+        with self.condition:
+            self.rate_limited += 1
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+        print(f"Spotify rate limit hit, pausing requests for {seconds:.0f}s")
+
+    def send(self, func):
+        user = is_user_initiated()
+        for attempt in range(self.max_retries + 1):
+            self.acquire(user)
+            try:
+                return func()
+            except SpotifyException as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                self.back_off(retry_after_of(e, self.default_retry_after))
+
+    def call(self, func, key=None):
+        # key identifies a coalescable request; None sends it unconditionally
+        if key is None:
+            return self.send(func)
+
+        with self.in_flight_lock:
+            pending = self.in_flight.get(key)
+            if pending is None:
+                pending = self.in_flight[key] = InFlight()
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            return pending.wait()
+
+        try:
+            pending.result = self.send(func)
+            return pending.result
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self.in_flight_lock:
+                del self.in_flight[key]
+            pending.done.set()
+
+    def stats(self):
+        with self.condition:
+            return {'requests': self.requests, 'coalesced': self.coalesced, 'rate_limited': self.rate_limited}
+
+
+class GovernedSpotify(spotipy.Spotify):
+    # spotipy client whose every HTTP call is paced by a RequestGovernor
+    def __init__(self, *args, governor, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.governor = governor
+
+    def _internal_call(self, method, url, payload, params):
+        key = None
+        if method == 'GET' and not payload:
+            key = (url, repr(sorted(params.items())))
+        return self.governor.call(lambda: super(GovernedSpotify, self)._internal_call(method, url, payload, params), key)
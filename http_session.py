@@ -0,0 +1,45 @@
+import requests
+from urllib3.util.retry import Retry
+
+# Same retry policy spotipy builds for its own session, except for 429:
+# RequestGovernor handles those for every thread at once, where urllib3 would
+# only put the one thread that hit the limit to sleep
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+
+def build_session(pool_size, retries=3, backoff_factor=0.3):
+    # One keep-alive session for the whole process: Spotify API calls, token
+    # exchange/refresh and album art downloads. pool_size is the number of
+    # connections kept open per host, which should cover every thread that can
+    # make a request at once. Extra concurrent requests still go through, on a
+    # connection that is closed afterwards, rather than blocking.
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        respect_retry_after_header=False)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def connection_stats(session):
+    # host -> {'connections': opened, 'requests': sent}. requests well above
+    # connections means keep-alive is doing its job.
+    stats = {}
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = stats.setdefault(pool.host, {'connections': 0, 'requests': 0})
+            host['connections'] += pool.num_connections
+            host['requests'] += pool.num_requests
+    return stats
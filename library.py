@@ -0,0 +1,247 @@
+import os
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'spotipi', 'library.sqlite3')
+
+# Only request the playlist track fields we display and store
+PLAYLIST_TRACK_FIELDS = 'items(track(uri,name,artists(name))),total'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS playlists (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    snapshot_id TEXT,
+    position INTEGER NOT NULL,
+    tracks_snapshot_id TEXT
+);
+CREATE TABLE IF NOT EXISTS playlist_tracks (
+    playlist_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    uri TEXT NOT NULL,
+    name TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, position)
+);
+CREATE TABLE IF NOT EXISTS saved_tracks (
+    position INTEGER PRIMARY KEY,
+    uri TEXT NOT NULL,
+    name TEXT NOT NULL,
+    artist TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+
+def track_rows(page):
+    # (uri, name, artist) for every real track on a playlist_tracks page
+    rows = []
+    for item in page['items']:
+        track = item.get('track')
+        if track is not None and track.get('uri'):
+            artist_name = track['artists'][0]['name'] if track.get('artists') else ''
+            rows.append((track['uri'], track['name'], artist_name))
+    return rows
+
+
+def saved_tracks_marker(page):
+    # Liked songs have no snapshot_id; the count plus the newest added_at
+    # changes whenever a track is liked or unliked
+    newest = page['items'][0]['added_at'] if page['items'] else ''
+    return f"{page.get('total', 0)}:{newest}"
+
+
+def fetch_playlist_tracks(sp, page_fetcher, playlist_id, is_cancelled=lambda: False):
+    # Yields one list of rows per page, in playlist order
+    def fetch_page(offset, limit):
+        return sp.playlist_tracks(playlist_id, fields=PLAYLIST_TRACK_FIELDS, offset=offset, limit=limit)
+
+    for page in page_fetcher.iter_pages(fetch_page, 100, is_cancelled):
+        yield track_rows(page)
+
+
+class LibraryIndex:
+    # Local SQLite copy of the user's playlists and their tracks. A playlist's
+    # tracks are current when tracks_snapshot_id matches its snapshot_id.
+    def __init__(self, path=DEFAULT_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.executescript(SCHEMA)
+
+    def playlists(self):
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT id, name, snapshot_id FROM playlists ORDER BY position').fetchall()
+        return [{'id': playlist_id, 'name': name, 'snapshot_id': snapshot_id}
+                for playlist_id, name, snapshot_id in rows]
+
+    def snapshot_id(self, playlist_id):
+        with self.lock:
+            row = self.db.execute(
+                'SELECT snapshot_id FROM playlists WHERE id = ?', (playlist_id,)).fetchone()
+        return row[0] if row else None
+
+    def current_tracks(self, playlist_id):
+        # Stored rows if they match the playlist's latest known snapshot, else None
+        with self.lock:
+            row = self.db.execute(
+                'SELECT snapshot_id, tracks_snapshot_id FROM playlists WHERE id = ?',
+                (playlist_id,)).fetchone()
+            if row is None or row[1] is None or row[0] != row[1]:
+                return None
+            return self.db.execute(
+                'SELECT uri, name, artist FROM playlist_tracks WHERE playlist_id = ? ORDER BY position',
+                (playlist_id,)).fetchall()
+
+    def all_tracks(self):
+        # Liked songs first, then playlist tracks in playlist order, for the search index
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT uri, name, artist, 0, 0, position FROM saved_tracks '
+                'UNION ALL '
+                'SELECT t.uri, t.name, t.artist, 1, p.position, t.position FROM playlist_tracks t '
+                'JOIN playlists p ON p.id = t.playlist_id '
+                'ORDER BY 4, 5, 6').fetchall()
+        return [row[:3] for row in rows]
+
+    def get_meta(self, key):
+        with self.lock:
+            row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def replace_saved_tracks(self, marker, rows):
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM saved_tracks')
+            self.db.executemany(
+                'INSERT INTO saved_tracks (position, uri, name, artist) VALUES (?, ?, ?, ?)',
+                [(position, uri, name, artist) for position, (uri, name, artist) in enumerate(rows)])
+            self.db.execute(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', ('saved_tracks_marker', marker))
+
+    def stale_playlists(self):
+        with self.lock:
+            return self.db.execute(
+                'SELECT id, snapshot_id FROM playlists '
+                'WHERE tracks_snapshot_id IS NULL OR tracks_snapshot_id != snapshot_id '
+                'ORDER BY position').fetchall()
+
+    def replace_playlists(self, playlists):
+        # playlists are dicts with id, name and snapshot_id; returns True if anything changed
+        rows = [(playlist['id'], playlist['name'], playlist.get('snapshot_id'), position)
+                for position, playlist in enumerate(playlists)]
+
+        with self.lock, self.db:
+            existing = self.db.execute(
+                'SELECT id, name, snapshot_id, position FROM playlists ORDER BY position').fetchall()
+            if existing == rows:
+                return False
+
+            ids = [row[0] for row in rows]
+            placeholders = ','.join('?' * len(ids))
+            self.db.execute(f'DELETE FROM playlists WHERE id NOT IN ({placeholders})', ids)
+            self.db.execute(f'DELETE FROM playlist_tracks WHERE playlist_id NOT IN ({placeholders})', ids)
+            self.db.executemany(
+                'INSERT INTO playlists (id, name, snapshot_id, position) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET name = excluded.name, '
+                'snapshot_id = excluded.snapshot_id, position = excluded.position',
+                rows)
+        return True
+
+    def replace_tracks(self, playlist_id, snapshot_id, rows):
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM playlist_tracks WHERE playlist_id = ?', (playlist_id,))
+            self.db.executemany(
+                'INSERT INTO playlist_tracks (playlist_id, position, uri, name, artist) VALUES (?, ?, ?, ?, ?)',
+                [(playlist_id, position, uri, name, artist)
+                 for position, (uri, name, artist) in enumerate(rows)])
+            self.db.execute(
+                'UPDATE playlists SET tracks_snapshot_id = ? WHERE id = ?', (snapshot_id, playlist_id))
+
+
+class LibrarySync:
+    # Keeps a LibraryIndex up to date in the background. Each pass takes the
+    # playlist list from the PlaylistRepository and only re-fetches tracks for
+    # playlists whose snapshot_id changed, plus the liked songs when their
+    # count or newest entry changed. Subscribers get ('playlists', None),
+    # ('tracks', playlist_id), ('saved_tracks', None) and, after a pass that
+    # changed anything, ('synced', None) notifications.
+    def __init__(self, sp, index, repository, page_fetcher, interval=900):
+        self.sp = sp
+        self.index = index
+        self.repository = repository
+        self.page_fetcher = page_fetcher
+        self.interval = interval
+        self.subscribers = []
+        self.wake_event = threading.Event()
+        self.thread = None
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def notify(self, kind, playlist_id):
+        for callback in list(self.subscribers):
+            try:
+                callback(kind, playlist_id)
+            except Exception as e:
+                print(f"Error in library subscriber: {e}")
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def sync_now(self):
+        self.wake_event.set()
+
+    def run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Error syncing library: {e}")
+            self.wake_event.wait(self.interval)
+            self.wake_event.clear()
+
+    def sync(self):
+        changed = False
+        if self.index.replace_playlists(self.repository.get()):
+            changed = True
+            self.notify('playlists', None)
+
+        for playlist_id, snapshot_id in self.index.stale_playlists():
+            rows = []
+            for page_rows in fetch_playlist_tracks(self.sp, self.page_fetcher, playlist_id):
+                rows.extend(page_rows)
+            self.index.replace_tracks(playlist_id, snapshot_id, rows)
+            changed = True
+            self.notify('tracks', playlist_id)
+
+        if self.sync_saved_tracks():
+            changed = True
+            self.notify('saved_tracks', None)
+
+        if changed:
+            self.notify('synced', None)
+
+    def sync_saved_tracks(self):
+        first = self.sp.current_user_saved_tracks(limit=50)
+        marker = saved_tracks_marker(first)
+        if marker == self.index.get_meta('saved_tracks_marker'):
+            return False
+
+        def fetch_page(offset, limit):
+            if offset == 0:
+                return first
+            return self.sp.current_user_saved_tracks(limit=limit, offset=offset)
+
+        rows = []
+        for page in self.page_fetcher.iter_pages(fetch_page, 50):
+            rows.extend(track_rows(page))
+        self.index.replace_saved_tracks(marker, rows)
+        return True
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from governor import is_user_initiated, user_initiated
+
+
+class PageFetcher:
+    # Fetches every page of a Spotify paging object. The first page tells us
+    # the total, the remaining offsets are requested concurrently, and pages
+    # are yielded strictly in order as soon as each one is available.
+    #
+    # It has its own executors so a WorkerPool task can wait on pages without
+    # tying up the slots its own pages need. Pages for a user action (e.g.
+    # opening a playlist) get a separate executor, so they never queue behind
+    # the pages a library sync has already submitted, and keep the caller's
+    # user_initiated() priority on the page threads.
+    def __init__(self, max_parallel=4):
+        self.max_parallel = max_parallel
+        self.executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix='spotipi-pages')
+        self.user_executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix='spotipi-user-pages')
+
+    def submit(self, fetch_page, offset, limit):
+        if not is_user_initiated():
+            return self.executor.submit(fetch_page, offset, limit)
+
+        def fetch_user_page():
+            with user_initiated():
+                return fetch_page(offset, limit)
+
+        return self.user_executor.submit(fetch_user_page)
+
+    def iter_pages(self, fetch_page, limit, is_cancelled=lambda: False):
+        # fetch_page(offset, limit) must return a paging dict with 'items' and 'total'
+        first = fetch_page(0, limit)
+        yield first
+
+        total = first.get('total') or 0
+        if is_cancelled() or len(first['items']) < limit or total <= limit:
+            return
+
+        futures = [self.submit(fetch_page, offset, limit)
+                   for offset in range(limit, total, limit)]
+        try:
+            for future in futures:
+                if is_cancelled():
+                    return
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,218 @@
+import threading
+import time
+
+# Sentinel so the first poll always publishes, even when nothing is playing
+UNSET = object()
+
+
+def track_id_of(snapshot):
+    if snapshot and snapshot.get('item'):
+        return snapshot['item'].get('id')
+    return None
+
+
+def is_playing_of(snapshot):
+    return bool(snapshot and snapshot.get('is_playing'))
+
+
+def device_id_of(snapshot):
+    if snapshot and snapshot.get('device'):
+        return snapshot['device'].get('id')
+    return None
+
+
+def duration_ms_of(snapshot):
+    if snapshot and snapshot.get('item'):
+        return snapshot['item'].get('duration_ms') or 0
+    return 0
+
+
+def position_ms_at(snapshot, fetched_at, now):
+    # Where playback is at monotonic time `now`, extrapolated from the
+    # progress_ms reported when the snapshot was fetched
+    if not snapshot or snapshot.get('progress_ms') is None:
+        return 0
+    position = snapshot['progress_ms']
+    if is_playing_of(snapshot):
+        position += (now - fetched_at) * 1000
+    duration = duration_ms_of(snapshot)
+    return min(position, duration) if duration else position
+
+
+# How far a polled position may stray from the one extrapolated from the
+# previous poll before it counts as a jump (seek, restart, repeat-one)
+POSITION_TOLERANCE_MS = 2000
+
+
+def diff_snapshots(old, new, old_fetched_at=None, now=None):
+    # old_fetched_at/now (monotonic) enable the 'position' change, reported
+    # when the same track's progress jumped rather than just moved on
+    if old is UNSET:
+        return {'track', 'is_playing', 'device'}
+
+    changes = set()
+    if track_id_of(old) != track_id_of(new):
+        changes.add('track')
+    if is_playing_of(old) != is_playing_of(new):
+        changes.add('is_playing')
+    if device_id_of(old) != device_id_of(new):
+        changes.add('device')
+
+    if ('track' not in changes and track_id_of(new) and old_fetched_at is not None
+            and new.get('progress_ms') is not None):
+        expected = position_ms_at(old, old_fetched_at, now)
+        if abs(new['progress_ms'] - expected) > POSITION_TOLERANCE_MS:
+            changes.add('position')
+    return changes
+
+
+class PollSchedule:
+    # Decides how long to sleep before the next current_playback() call.
+    # While playing it sleeps until just before the expected track end, right
+    # after a user action it polls quickly, and when paused or idle it backs off.
+    def __init__(self, playing_max=15.0, end_lead=1.0, end_grace=0.3,
+                 burst_interval=0.75, burst_window=4.0,
+                 idle_min=5.0, idle_max=60.0):
+        self.playing_max = playing_max
+        self.end_lead = end_lead
+        self.end_grace = end_grace
+        self.burst_interval = burst_interval
+        self.burst_window = burst_window
+        self.idle_min = idle_min
+        self.idle_max = idle_max
+        self.burst_until = 0.0
+        self.idle_delay = idle_min
+
+    def user_action(self):
+        self.burst_until = time.monotonic() + self.burst_window
+        self.idle_delay = self.idle_min
+
+    def settle(self):
+        self.burst_until = 0.0
+
+    def in_burst(self):
+        return time.monotonic() < self.burst_until
+
+    def next_delay(self, snapshot, failed=False):
+        if self.in_burst():
+            return self.burst_interval
+
+        if failed or not is_playing_of(snapshot) or not snapshot.get('item'):
+            delay = self.idle_delay
+            self.idle_delay = min(self.idle_max, self.idle_delay * 2)
+            return delay
+
+        self.idle_delay = self.idle_min
+        progress_ms = snapshot.get('progress_ms')
+        duration_ms = snapshot['item'].get('duration_ms')
+        if progress_ms is None or not duration_ms:
+            return self.playing_max
+
+        remaining = max(0.0, (duration_ms - progress_ms) / 1000)
+        if remaining > self.end_lead:
+            return min(self.playing_max, remaining - self.end_lead)
+        # Close to the end: wake just after the track should have changed
+        return remaining + self.end_grace
+
+
+class PlaybackState:
+    # Polls sp.current_playback() on one background thread and publishes
+    # the changes ('track', 'is_playing', 'device', 'position') to subscribed callbacks.
+    def __init__(self, sp, schedule=None):
+        self.sp = sp
+        self.schedule = schedule or PollSchedule()
+        self.snapshot = UNSET
+        self.fetched_at = None
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started_at = None
+        self.call_count = 0
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+            snapshot = self.snapshot
+
+        # Late subscribers get the current state straight away
+        if snapshot is not UNSET:
+            self.notify(callback, snapshot, diff_snapshots(UNSET, snapshot))
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def current(self):
+        with self.lock:
+            return None if self.snapshot is UNSET else self.snapshot
+
+    def current_with_time(self):
+        # The snapshot together with the monotonic time it was fetched
+        with self.lock:
+            if self.snapshot is UNSET:
+                return None, None
+            return self.snapshot, self.fetched_at
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def poll_now(self, user_action=True):
+        # After skip/prev/play the new state takes a moment to show up on
+        # Spotify's side, so keep polling quickly for a short window
+        if user_action:
+            self.schedule.user_action()
+        self.wake_event.set()
+
+    def calls_per_hour(self):
+        if self.started_at is None:
+            return 0.0
+        elapsed = max(1.0, time.monotonic() - self.started_at)
+        return self.call_count * 3600 / elapsed
+
+    def run(self):
+        self.started_at = time.monotonic()
+        while not self.stop_event.is_set():
+            delay = self.poll()
+            self.wake_event.wait(delay)
+            self.wake_event.clear()
+
+    def poll(self):
+        self.call_count += 1
+        try:
+            snapshot = self.sp.current_playback()
+        except Exception as e:
+            print(f"Error polling playback state: {e}")
+            return self.schedule.next_delay(None, failed=True)
+
+        changes = self.publish(snapshot)
+        if changes and self.schedule.in_burst():
+            self.schedule.settle()
+        return self.schedule.next_delay(snapshot)
+
+    def publish(self, snapshot):
+        now = time.monotonic()
+        with self.lock:
+            changes = diff_snapshots(self.snapshot, snapshot, self.fetched_at, now)
+            self.snapshot = snapshot
+            self.fetched_at = now
+            subscribers = list(self.subscribers)
+
+        if changes:
+            for callback in subscribers:
+                self.notify(callback, snapshot, changes)
+        return changes
+
+    def notify(self, callback, snapshot, changes):
+        try:
+            callback(snapshot, changes)
+        except Exception as e:
+            print(f"Error in playback state subscriber: {e}")
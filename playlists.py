@@ -0,0 +1,86 @@
+import threading
+import time
+
+
+class PlaylistRepository:
+    # The user's full playlist list, shared by every page. All pages of
+    # current_user_playlists are fetched concurrently, concurrent callers share
+    # one in-flight fetch, and the result is cached for ttl seconds.
+    # Subscribers get the whole list whenever it changes.
+    def __init__(self, sp, page_fetcher, ttl=300, initial=None):
+        self.sp = sp
+        self.page_fetcher = page_fetcher
+        self.ttl = ttl
+        self.playlists = list(initial or [])
+        self.fetched_at = None
+        self.lock = threading.Lock()
+        self.inflight = None
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+            playlists = list(self.playlists)
+        if playlists:
+            callback(playlists)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def is_fresh(self):
+        return self.fetched_at is not None and time.monotonic() - self.fetched_at < self.ttl
+
+    def cached(self):
+        with self.lock:
+            return list(self.playlists)
+
+    def get(self, force=False):
+        with self.lock:
+            if not force and self.is_fresh():
+                return list(self.playlists)
+
+            inflight = self.inflight
+            if inflight is None:
+                inflight = self.inflight = threading.Event()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            # Someone else is already fetching, share their result
+            inflight.wait()
+            return self.cached()
+
+        try:
+            playlists = self.fetch_all()
+            # Store the result before waking the callers sharing this fetch,
+            # they read it back with cached()
+            with self.lock:
+                changed = playlists != self.playlists
+                self.playlists = playlists
+                self.fetched_at = time.monotonic()
+                subscribers = list(self.subscribers)
+        finally:
+            with self.lock:
+                self.inflight = None
+            inflight.set()
+
+        if changed:
+            for callback in subscribers:
+                try:
+                    callback(list(playlists))
+                except Exception as e:
+                    print(f"Error in playlist subscriber: {e}")
+        return list(playlists)
+
+    def fetch_all(self):
+        def fetch_page(offset, limit):
+            return self.sp.current_user_playlists(limit=limit, offset=offset)
+
+        playlists = []
+        for page in self.page_fetcher.iter_pages(fetch_page, 50):
+            playlists.extend(page['items'])
+        return [{'id': playlist['id'], 'name': playlist['name'], 'snapshot_id': playlist.get('snapshot_id')}
+                for playlist in playlists if playlist]
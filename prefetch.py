@@ -0,0 +1,100 @@
+import threading
+
+from album_art import pick_image_url
+from playback_state import track_id_of
+
+
+def images_of(item):
+    # Tracks carry their covers on the album, podcast episodes on themselves
+    return (item.get('album') or {}).get('images') or item.get('images') or []
+
+
+class UpcomingPrefetcher:
+    # On every track change, looks up what plays next and warms the album art
+    # cache for it, so Page2 can show the new cover the moment the track
+    # changes. Upcoming items come from the Spotify queue; if that is empty
+    # or fails, from the rows after the current track in the playlist Page3
+    # has open. Work runs on the shared worker pool and its API calls go out
+    # at background priority.
+    def __init__(self, sp, playback_state, album_art_cache, workers, ui, art_size=250, depth=2):
+        self.sp = sp
+        self.playback_state = playback_state
+        self.album_art_cache = album_art_cache
+        self.workers = workers
+        self.ui = ui
+        self.art_size = art_size
+        self.depth = depth
+        self.lock = threading.Lock()
+        self.upcoming = []
+        self.upcoming_after = None
+        self.playlist_source = None
+        self.prefetched = 0
+
+    def start(self):
+        self.playback_state.subscribe(self.on_playback_change)
+
+    def set_playlist_source(self, source):
+        # source() returns the track URIs of the playlist currently shown
+        self.playlist_source = source
+
+    def upcoming_track(self, current_uri, index):
+        # Metadata of the track `index` places after current_uri, if known.
+        # None while the list still belongs to an earlier track.
+        with self.lock:
+            if self.upcoming_after != current_uri or not 0 <= index < len(self.upcoming):
+                return None
+            return self.upcoming[index]
+
+    def on_playback_change(self, snapshot, changes):
+        if 'track' in changes and track_id_of(snapshot):
+            self.workers.submit_latest('prefetch', self.prefetch, snapshot['item'].get('uri'))
+
+    def prefetch(self, task, current_uri):
+        items = self.queue_items() or self.playlist_items(current_uri)
+        if task.is_cancelled():
+            return
+
+        with self.lock:
+            self.upcoming = items
+            self.upcoming_after = current_uri
+        for item in items[:self.depth]:
+            if task.is_cancelled():
+                return
+            self.warm_album_art(item)
+
+    def queue_items(self):
+        try:
+            return [item for item in self.sp.queue().get('queue', []) if item]
+        except Exception as e:
+            print(f"Error fetching the playback queue: {e}")
+            return []
+
+    def playlist_items(self, current_uri):
+        uris = self.playlist_source() if self.playlist_source else []
+        if current_uri not in uris:
+            return []
+
+        start = uris.index(current_uri) + 1
+        ids = [uri.split(':')[-1] for uri in uris[start:start + self.depth]]
+        if not ids:
+            return []
+        try:
+            return [track for track in self.sp.tracks(ids).get('tracks', []) if track]
+        except Exception as e:
+            print(f"Error fetching upcoming tracks: {e}")
+            return []
+
+    def warm_album_art(self, item):
+        url = pick_image_url(images_of(item), self.art_size)
+        if not url or self.album_art_cache.get(url) is not None:
+            return
+        try:
+            image = self.album_art_cache.fetch_image(url)
+        except Exception as e:
+            print(f"Error prefetching album art: {e}")
+            return
+
+        # PhotoImages can only be made on the Tk thread; once made, the cover
+        # is decoded and sized in memory, ready to display
+        self.ui.post(self.album_art_cache.make_photo, url, image)
+        self.prefetched += 1
@@ -0,0 +1,43 @@
+import threading
+import time
+from collections import OrderedDict
+
+from search_index import normalize
+
+
+def query_key(query):
+    return ' '.join(normalize(query).split())
+
+
+class QueryCache:
+    # LRU of normalized search query -> results, each entry valid for ttl seconds.
+    # Backspacing or retyping a recent query is answered without an API call.
+    def __init__(self, max_entries=128, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query):
+        key = query_key(query)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, query, results):
+        key = query_key(query)
+        with self.lock:
+            self.entries[key] = (time.monotonic(), results)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
@@ -0,0 +1,55 @@
+import threading
+import time
+
+SDK_PLAYER_NAME = 'Web Playback SDK Quick Start Player'
+
+
+class SdkDevice:
+    # Device id of the Web Playback SDK player in the /player page. The page
+    # reports it to the Flask app as soon as the SDK fires 'ready' (and again
+    # on 'not_ready'), so callers can wait for it instead of sleeping.
+    def __init__(self):
+        self.device_id = None
+        self.condition = threading.Condition()
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        # callback(device_id, ready)
+        self.subscribers.append(callback)
+
+    def notify(self, device_id, ready):
+        for callback in list(self.subscribers):
+            try:
+                callback(device_id, ready)
+            except Exception as e:
+                print(f"Error in SDK device subscriber: {e}")
+
+    def mark_ready(self, device_id):
+        with self.condition:
+            self.device_id = device_id
+            self.condition.notify_all()
+        self.notify(device_id, True)
+
+    def mark_not_ready(self, device_id):
+        with self.condition:
+            if self.device_id == device_id:
+                self.device_id = None
+        self.notify(device_id, False)
+
+    def is_ready(self):
+        return self.device_id is not None
+
+    def wait(self, timeout, is_cancelled=lambda: False):
+        # Returns the device id, or None on timeout or cancellation
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.device_id is None and not is_cancelled():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(min(remaining, 0.25))
+            return self.device_id
+
+
+# Shared by the Tk app and the Flask app running in the same process
+sdk_device = SdkDevice()
@@ -0,0 +1,121 @@
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    # Case- and accent-insensitive: "Beyoncé" and "beyonce" index the same
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def words_of(text):
+    return WORD_RE.findall(normalize(text))
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrackSearchIndex:
+    # In-memory search over (uri, name, artist) rows. Query words match indexed
+    # words by prefix (found by bisecting the sorted word list), falling back to
+    # trigram similarity for typos. Built off the UI thread, then swapped in
+    # whole, so searching never sees a half-built index.
+    def __init__(self, max_prefix_words=500, fuzzy_threshold=0.35):
+        self.max_prefix_words = max_prefix_words
+        self.fuzzy_threshold = fuzzy_threshold
+        # (tracks, sorted words, word -> docs, trigram -> words)
+        self.state = ([], [], {}, {})
+
+    def __len__(self):
+        return len(self.state[0])
+
+    def build(self, rows):
+        tracks = []
+        seen = set()
+        postings = {}
+        for uri, name, artist in rows:
+            if uri in seen:
+                continue
+            seen.add(uri)
+            doc = len(tracks)
+            tracks.append((uri, name, artist, normalize(name)))
+            for word in set(words_of(name)) | set(words_of(artist)):
+                postings.setdefault(word, []).append(doc)
+
+        word_trigrams = {}
+        for word in postings:
+            for gram in trigrams(word):
+                word_trigrams.setdefault(gram, []).append(word)
+
+        # A single assignment, so a search in progress keeps using the old state
+        self.state = (tracks, sorted(postings), postings, word_trigrams)
+
+    def prefix_words(self, words, term):
+        matches = []
+        i = bisect_left(words, term)
+        while i < len(words) and words[i].startswith(term) and len(matches) < self.max_prefix_words:
+            matches.append(words[i])
+            i += 1
+        return matches
+
+    def fuzzy_words(self, word_trigrams, term):
+        term_grams = trigrams(term)
+        # A word with Jaccard similarity >= t shares at least t * len(term_grams)
+        # trigrams with the term, so it must contain one of the rarest
+        # len - min_shared + 1 of them. Only those posting lists are scanned.
+        min_shared = max(1, math.ceil(self.fuzzy_threshold * len(term_grams)))
+        rarest = sorted(term_grams, key=lambda gram: len(word_trigrams.get(gram, ())))
+        candidates = set()
+        for gram in rarest[:len(term_grams) - min_shared + 1]:
+            candidates.update(word_trigrams.get(gram, ()))
+
+        matches = []
+        for word in candidates:
+            word_grams = trigrams(word)
+            similarity = len(term_grams & word_grams) / len(term_grams | word_grams)
+            if similarity >= self.fuzzy_threshold:
+                matches.append((word, similarity))
+        return matches
+
+    def search(self, query, limit=20):
+        tracks, words, postings, word_trigrams = self.state
+        terms = words_of(query)
+        if not terms or not tracks:
+            return []
+
+        scores = None
+        for term in terms:
+            # Exact word 3, prefix 2, typo match scored by its similarity (< 1)
+            term_scores = {}
+            matched = [(word, 3 if word == term else 2) for word in self.prefix_words(words, term)]
+            if not matched and len(term) >= 3:
+                matched = self.fuzzy_words(word_trigrams, term)
+
+            for word, word_weight in matched:
+                for doc in postings[word]:
+                    if term_scores.get(doc, 0) < word_weight:
+                        term_scores[doc] = word_weight
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: score + term_scores[doc] for doc, score in scores.items() if doc in term_scores}
+            if not scores:
+                return []
+
+        # Titles that start with the query rank first, then by score, then library order
+        normalized_query = normalize(query).strip()
+
+        def rank(doc):
+            bonus = 5 if tracks[doc][3].startswith(normalized_query) else 0
+            return (scores[doc] + bonus, -doc)
+
+        best = heapq.nlargest(limit, scores, key=rank)
+        return [tracks[doc][:3] for doc in best]
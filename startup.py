@@ -0,0 +1,32 @@
+import threading
+import time
+
+# Imported first by app.py and tkinter_app.py, so this is as close to process
+# start as the report can measure from
+STARTED = time.perf_counter()
+
+
+class StartupTimer:
+    # Milliseconds from process start to each startup stage, printed once
+    # every stage has been reached. Only the first mark of a stage counts.
+    def __init__(self, stages=('import', 'first_paint', 'first_data')):
+        self.stages = stages
+        self.marks = {}
+        self.lock = threading.Lock()
+
+    def mark(self, stage):
+        with self.lock:
+            if stage in self.marks:
+                return
+            self.marks[stage] = (time.perf_counter() - STARTED) * 1000
+            done = all(name in self.marks for name in self.stages)
+        if done:
+            self.report()
+
+    def report(self):
+        with self.lock:
+            parts = [f"{name} {self.marks[name]:.0f} ms" for name in self.stages if name in self.marks]
+        print("Startup timing: " + ", ".join(parts))
+
+
+startup_timer = StartupTimer()
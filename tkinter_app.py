@@ -1,16 +1,32 @@
+from startup import startup_timer
 import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
 import os
-import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from dotenv import load_dotenv
-import threading
 import webbrowser
 import time
 import requests
-import io
 import base64
+from token_manager import TokenManager
+from http_session import build_session
+from governor import GovernedSpotify, RequestGovernor, user_initiated
+from playback_state import PlaybackState, duration_ms_of, is_playing_of, position_ms_at
+from album_art import AlbumArtCache, pick_image_url
+from ui_dispatch import UIDispatcher
+from workers import WorkerPool
+from paging import PageFetcher
+from virtual_list import VirtualTrackList
+from library import LibraryIndex, LibrarySync, fetch_playlist_tracks
+from playlists import PlaylistRepository
+from search_index import TrackSearchIndex
+from query_cache import QueryCache
+from commands import PlaybackCommands
+from transport import TransportQueue
+from prefetch import UpcomingPrefetcher, images_of
+from sdk_device import sdk_device
+from devices import DeviceRegistry
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,21 +36,134 @@ CLIENT_ID = os.getenv('SPOTIPY_CLIENT_ID')
 CLIENT_SECRET = os.getenv('SPOTIPY_CLIENT_SECRET')
 REDIRECT_URI = os.getenv('SPOTIPY_REDIRECT_URI')
 
+# Background work from every page shares this fixed-size pool
+workers = WorkerPool(max_workers=4)
+
+# Concurrent fetching of the remaining pages of long paged results
+page_fetcher = PageFetcher(max_parallel=4)
+
+# Keep-alive connections shared by every thread that talks to Spotify: the
+# workers, both page fetcher executors and the poller/device/library/token threads
+BACKGROUND_THREADS = 4
+http_session = build_session(pool_size=workers.max_workers + 2 * page_fetcher.max_parallel + BACKGROUND_THREADS)
+
 # Create a SpotifyOAuth object
 sp_oauth = SpotifyOAuth(client_id=CLIENT_ID,
                         client_secret=CLIENT_SECRET,
                         redirect_uri=REDIRECT_URI,
-                        scope='user-modify-playback-state user-read-playback-state user-library-modify playlist-modify-public playlist-modify-private')
+                        scope='user-modify-playback-state user-read-playback-state user-library-read user-library-modify playlist-modify-public playlist-modify-private streaming user-read-email user-read-private',
+                        requests_session=http_session)
+
+# One token for the whole process (Tk pages and the Flask web player),
+# refreshed in the background before it expires. Logging in happens on the
+# token manager's thread once the window is up; API calls wait for it there.
+token_manager = TokenManager(sp_oauth)
+
+# Paces every API call against one budget, backs off together on a 429 and
+# lets taps and searches jump ahead of background polling
+governor = RequestGovernor()
+sp = GovernedSpotify(auth_manager=token_manager, requests_session=http_session, governor=governor)
+
+# Single shared poller for current playback, pages subscribe to its changes
+playback_state = PlaybackState(sp)
+
+def on_first_playback_data(snapshot, changes):
+    # The first snapshot published is the first live data the pages can show
+    startup_timer.mark('first_data')
+    playback_state.unsubscribe(on_first_playback_data)
+
+playback_state.subscribe(on_first_playback_data)
+
+# Known Connect devices, refreshed in the background and whenever they may have changed
+device_registry = DeviceRegistry(sp, interval=60)
+
+def on_sdk_device_change(device_id, ready):
+    device_registry.invalidate()
+
+def on_playback_device_change(snapshot, changes):
+    if 'device' in changes:
+        device_registry.invalidate()
+
+sdk_device.subscribe(on_sdk_device_change)
+playback_state.subscribe(on_playback_device_change)
+
+# Play/add actions that reuse the last-known state instead of re-fetching it
+commands = PlaybackCommands(sp, playback_state, sdk_device, device_registry)
+
+# Page2's play/pause/next/previous, sent in the background and coalesced
+transport = TransportQueue(commands, playback_state)
+
+# Resized album art, kept in memory and on disk across restarts
+album_art_cache = AlbumArtCache(size=(250, 250), session=http_session)
+
+# Worker threads hand widget updates to the Tk main loop through this queue
+ui = UIDispatcher()
+
+# Album art for what plays next, fetched ahead of the track change
+prefetcher = UpcomingPrefetcher(sp, playback_state, album_art_cache, workers, ui)
 
-# Get the token
-token_info = sp_oauth.get_access_token(as_dict=False)
-sp = spotipy.Spotify(auth=token_info)
+# Playlists and their tracks on disk, re-synced when a snapshot_id changes
+library = LibraryIndex()
+
+# Every page of the user's playlists, fetched once and shared by Page3 and Page4.
+# Starts from the copy on disk so the trees fill before the network answers.
+playlist_repository = PlaylistRepository(sp, page_fetcher, ttl=300, initial=library.playlists())
+library_sync = LibrarySync(sp, library, playlist_repository, page_fetcher)
+
+def refresh_stale_playlists():
+    # Pages showing playlists call this when raised. Past the repository's
+    # ttl, an early library sync picks up playlists added or renamed since.
+    if not playlist_repository.is_fresh():
+        library_sync.sync_now()
+
+# Local search over liked songs and playlist tracks, rebuilt after each library sync
+search_index = TrackSearchIndex()
+
+def rebuild_search_index(task):
+    search_index.build(library.all_tracks())
+    print(f"Search index built with {len(search_index)} tracks")
+
+def on_library_synced(kind, playlist_id):
+    if kind == 'synced':
+        workers.submit_latest('search_index', rebuild_search_index)
+
+library_sync.subscribe(on_library_synced)
+
+# Remote search results by normalized query, and how long typing must pause
+# before a remote search is sent
+remote_search_cache = QueryCache(max_entries=128, ttl=600)
+SEARCH_DEBOUNCE_MS = 350
+
+# How long Page2 shows "Skipping ahead..." if no new track turns up
+SKIP_LABEL_TIMEOUT_MS = 5000
+
+def format_ms(ms):
+    seconds = int(ms) // 1000
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+def show_playlists_in_tree(tree, playlists):
+    # Update rows in place, keyed by playlist id, so a changed list keeps the
+    # selection and scroll position
+    playlist_ids = {playlist['id'] for playlist in playlists}
+    stale = [row_id for row_id in tree.get_children() if row_id not in playlist_ids]
+    if stale:
+        tree.delete(*stale)
+
+    for index, playlist in enumerate(playlists):
+        if tree.exists(playlist['id']):
+            tree.item(playlist['id'], values=(playlist['name'],))
+            tree.move(playlist['id'], "", index)
+        else:
+            tree.insert("", index, iid=playlist['id'], values=(playlist['name'],), tags=(playlist['id'],))
 
 def launch_web_page():
     webbrowser.open('http://127.0.0.1:8888')
 
 class MultiPageApp(tk.Tk):
     def __init__(self, *args, **kwargs):
+        # How to log in when there is no cached token; defaults to spotipy's
+        # interactive flow
+        self.login = kwargs.pop('login', None)
         tk.Tk.__init__(self, *args, **kwargs)
 
         self.configure(bg='gray20')  # Set the background color of the main window
@@ -49,16 +178,19 @@ class MultiPageApp(tk.Tk):
         # Apply styles
         self.apply_styles()
 
-        for PageClass in (Page1, Page2, Page3, Page4):
-            page_name = PageClass.__name__
-            page = PageClass(self.container, self)
-            self.pages[page_name] = page
-            page.grid(row=0, column=0, sticky="nsew")
+        ui.attach(self)
 
+        # Pages are built the first time they are shown
+        self.page_classes = {PageClass.__name__: PageClass for PageClass in (Page1, Page2, Page3, Page4)}
+        self.current_page = None
         self.show_page("Page1")
 
         self.current_page_index = 0
 
+        # Paint the window, clock and cached playlists first; everything that
+        # touches the network starts once Tk is idle
+        self.after_idle(self.start_background_work)
+
         self.bind("<Button-1>", self.start_drag)
         self.bind("<B1-Motion>", self.do_drag)
         self.bind("<ButtonRelease-1>", self.end_drag)
@@ -80,9 +212,21 @@ class MultiPageApp(tk.Tk):
         y = (self.winfo_screenheight() // 2) - (height // 2)
         self.geometry('{}x{}+{}+{}'.format(width, height, x, y))
 
+    def get_page(self, page_name):
+        page = self.pages.get(page_name)
+        if page is None:
+            page = self.page_classes[page_name](self.container, self)
+            page.grid(row=0, column=0, sticky="nsew")
+            self.pages[page_name] = page
+        return page
+
     def show_page(self, page_name):
-        page = self.pages[page_name]
+        page = self.get_page(page_name)
+        if self.current_page is not None and self.current_page is not page:
+            self.current_page.hide()
+        self.current_page = page
         page.tkraise()
+        page.show()
 
     def start_drag(self, event):
         self.drag_start_x = event.x
@@ -91,6 +235,10 @@ class MultiPageApp(tk.Tk):
         pass
 
     def end_drag(self, event):
+        # Dragging a slider (Page2's seek bar) is not a swipe
+        if isinstance(event.widget, tk.Scale):
+            return
+
         drag_end_x = event.x
         drag_distance = drag_end_x - self.drag_start_x
 
@@ -101,6 +249,16 @@ class MultiPageApp(tk.Tk):
 
         self.show_page(self.page_order[self.current_page_index])
 
+    def start_background_work(self):
+        startup_timer.mark('first_paint')
+        token_manager.start(self.login)
+        transport.start()
+        prefetcher.start()
+        playback_state.start()
+        device_registry.start()
+        library_sync.start()
+        workers.submit_latest('search_index', rebuild_search_index)
+
     def apply_styles(self):
         style = ttk.Style()
         style.theme_use("clam")
@@ -134,10 +292,46 @@ class MultiPageApp(tk.Tk):
                         font=("Helvetica", 14),
                         rowheight=30)
 
-class Page1(tk.Frame):
+class Page(tk.Frame):
+    # Base for the pages. Only the raised page keeps its subscriptions and
+    # timers: hide() drops them and show() attaches them again. The shared
+    # services hand a new subscriber their current state, so a page catches up
+    # on whatever changed while it was hidden.
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent, bg='gray20')
         self.controller = controller
+        self.subscriptions = []
+        self.visible = False
+
+    def watch(self, source, callback):
+        # Subscribe callback (run on the UI thread) to source while visible
+        self.subscriptions.append((source, ui.wrap(callback)))
+
+    def show(self):
+        if self.visible:
+            return
+        self.visible = True
+        for source, callback in self.subscriptions:
+            source.subscribe(callback)
+        self.on_show()
+
+    def hide(self):
+        if not self.visible:
+            return
+        self.visible = False
+        for source, callback in self.subscriptions:
+            source.unsubscribe(callback)
+        self.on_hide()
+
+    def on_show(self):
+        pass
+
+    def on_hide(self):
+        pass
+
+class Page1(Page):
+    def __init__(self, parent, controller):
+        Page.__init__(self, parent, controller)
 
         self.columnconfigure(0, weight=1)
         self.rowconfigure(0, weight=1)
@@ -180,9 +374,11 @@ class Page1(tk.Frame):
         self.device_tree_frame.grid(row=len(self.menu_buttons), column=0, pady=5)
         self.device_tree_frame.grid_remove()
 
-        self.update_time()
-        self.update_album_art_and_song()
-        self.after(3000, self.update_periodically)
+        # The tree follows the device registry, so it is ready before it is opened
+        self.watch(device_registry, self.show_devices_in_tree)
+
+        self.time_after_id = None
+        self.watch(playback_state, self.on_playback_change)
 
         # Add a hamburger menu button at the bottom
         self.menu_icon = Image.open("images/menu.png")
@@ -193,13 +389,26 @@ class Page1(tk.Frame):
         menu_button.image = self.menu_icon
         menu_button.grid(row=5, column=0, pady=10)
 
+    def on_show(self):
+        self.update_time()
+
+    def on_hide(self):
+        if self.time_after_id is not None:
+            self.after_cancel(self.time_after_id)
+            self.time_after_id = None
+
     def update_time(self):
         current_time = time.strftime("%H:%M:%S")
         self.time_label.config(text=current_time)
-        self.after(1000, self.update_time)
+        # Wake just after the next second boundary rather than 1000 ms from
+        # now, so the clock never drifts and ticks once per second
+        ms_into_second = int(time.time() * 1000) % 1000
+        self.time_after_id = self.after(1000 - ms_into_second + 1, self.update_time)
+
+    def on_playback_change(self, current_track, changes):
+        if 'track' not in changes:
+            return
 
-    def update_album_art_and_song(self):
-        current_track = sp.current_playback()
         if current_track and current_track['item']:
             track_name = current_track['item']['name']
             artist_name = current_track['item']['artists'][0]['name']
@@ -207,10 +416,6 @@ class Page1(tk.Frame):
         else:
             self.song_label.config(text="")
 
-    def update_periodically(self):
-        self.update_album_art_and_song()
-        self.after(3000, self.update_periodically)
-
     def toggle_menu_buttons(self):
         if self.menu_visible:
             for button in self.menu_buttons:
@@ -224,8 +429,8 @@ class Page1(tk.Frame):
         if self.device_tree_frame.winfo_ismapped():
             self.device_tree_frame.grid_remove()
         else:
-            self.device_tree.delete(*self.device_tree.get_children())
-            self.load_devices()
+            # Show the known devices now and check for new ones in the background
+            device_registry.invalidate()
             self.device_tree_frame.grid()
 
     def launch_web_page(self):
@@ -238,34 +443,34 @@ class Page1(tk.Frame):
         self.toggle_device_tree()
 
     def on_device_select(self, event):
-        selected_item = self.device_tree.selection()[0]
-        device_id = self.device_tree.item(selected_item, "tags")[0]
-        self.transfer_playback(device_id)
+        selection = self.device_tree.selection()
+        if not selection:
+            return
+        self.transfer_playback(selection[0])
         self.device_tree_frame.grid_remove()
 
-    def load_devices(self):
-        def fetch_devices():
-            try:
-                devices = sp.devices()
-                device_list = devices.get('devices', [])
-
-                for device in device_list:
-                    device_id = device.get('id')
-                    device_name = device.get('name', 'Unknown Device')
-                    self.device_tree.insert("", "end", values=(device_name,), tags=(device_id,))
-            except Exception as e:
-                print(f"Error fetching devices: {e}")
-
-        threading.Thread(target=fetch_devices).start()
+    def show_devices_in_tree(self, devices):
+        # Update rows in place, keyed by device id, so the open tree doesn't flicker
+        device_ids = [device['id'] for device in devices if device.get('id')]
+        for row_id in self.device_tree.get_children():
+            if row_id not in device_ids:
+                self.device_tree.delete(row_id)
+
+        for index, device in enumerate(device for device in devices if device.get('id')):
+            device_name = device.get('name', 'Unknown Device')
+            if self.device_tree.exists(device['id']):
+                self.device_tree.item(device['id'], values=(device_name,))
+                self.device_tree.move(device['id'], "", index)
+            else:
+                self.device_tree.insert("", index, iid=device['id'], values=(device_name,), tags=(device['id'],))
 
     def transfer_playback(self, device_id):
-        sp.transfer_playback(device_id)
-        print(f"Transferred playback to device ID: {device_id}")
+        workers.submit(commands.transfer_playback, device_id)
+        print(f"Transferring playback to device ID: {device_id}")
 
-class Page2(tk.Frame):
+class Page2(Page):
     def __init__(self, parent, controller):
-        tk.Frame.__init__(self, parent, bg='gray20')
-        self.controller = controller
+        Page.__init__(self, parent, controller)
 
         self.columnconfigure(0, weight=1)
         self.rowconfigure(0, weight=1)
@@ -308,26 +513,115 @@ class Page2(tk.Frame):
         self.song_label = tk.Label(self, text="No music playing", font=("Helvetica", 16), fg="grey", bg="gray20")
         self.song_label.grid(row=3, column=0, pady=10, sticky="s")
 
-        self.last_track_id = None
+        progress_frame = tk.Frame(self, bg='gray20')
+        progress_frame.grid(row=4, column=0, pady=10, sticky="n")
 
-        self.placeholder_image = self.create_placeholder_image(250, 250)
+        self.elapsed_label = tk.Label(progress_frame, text="0:00", font=("Helvetica", 12), fg="grey", bg="gray20", width=5)
+        self.elapsed_label.grid(row=0, column=0)
 
-        self.update_album_art_and_song()
-        self.after(3000, self.update_periodically)
+        self.progress_scale = tk.Scale(progress_frame, orient="horizontal", from_=0, to=1, showvalue=0, length=300,
+                                       bg="gray20", troughcolor="#D3D3D3", highlightthickness=0, bd=0)
+        self.progress_scale.grid(row=0, column=1, padx=10)
+        self.progress_scale.bind("<ButtonPress-1>", self.start_seek)
+        self.progress_scale.bind("<ButtonRelease-1>", self.end_seek)
+
+        self.duration_label = tk.Label(progress_frame, text="0:00", font=("Helvetica", 12), fg="grey", bg="gray20", width=5)
+        self.duration_label.grid(row=0, column=2)
+
+        # Position is extrapolated from (position_ms, monotonic time, playing),
+        # re-anchored on track or play state changes and on seeks only
+        self.progress_anchor = (0, time.monotonic(), False)
+        self.duration_ms = 0
+        self.seeking = False
+        self.progress_after_id = None
+
+        self.placeholder_image = self.create_placeholder_image(250, 250)
+        self.album_art_url = None
+        self.skip_label_after = None
+
+        self.watch(playback_state, self.on_playback_change)
+        self.watch(transport, self.on_transport_failed)
+
+    def on_hide(self):
+        # No point downloading art for a page nobody is looking at; showing
+        # the page again replays the current track and fetches it then
+        workers.cancel('album_art')
+        self.album_art_url = None
+        self.stop_progress()
+
+    def sync_progress(self):
+        snapshot, fetched_at = playback_state.current_with_time()
+        now = time.monotonic()
+        playing = is_playing_of(snapshot)
+        expected = transport.expected_playing()
+        if expected is not None:
+            playing = expected
+        position = position_ms_at(snapshot, fetched_at, now) if snapshot else 0
+        self.progress_anchor = (position, now, playing)
+        self.duration_ms = duration_ms_of(snapshot)
+        self.progress_scale.config(to=max(self.duration_ms, 1))
+        self.duration_label.config(text=format_ms(self.duration_ms))
+        self.update_progress()
+
+    def position_ms(self):
+        position, anchored_at, playing = self.progress_anchor
+        if playing:
+            position += (time.monotonic() - anchored_at) * 1000
+        return min(position, self.duration_ms) if self.duration_ms else position
+
+    def update_progress(self):
+        self.stop_progress()
+        position = self.position_ms()
+        if not self.seeking:
+            self.progress_scale.set(position)
+        self.elapsed_label.config(text=format_ms(position))
+
+        # While playing, wake once per displayed second, right as it turns over
+        if self.progress_anchor[2] and position < self.duration_ms:
+            self.progress_after_id = self.after(1000 - int(position) % 1000 + 1, self.update_progress)
+
+    def set_progress_playing(self, playing):
+        self.progress_anchor = (self.position_ms(), time.monotonic(), playing)
+        self.update_progress()
+
+    def stop_progress(self):
+        if self.progress_after_id is not None:
+            self.after_cancel(self.progress_after_id)
+            self.progress_after_id = None
+
+    def start_seek(self, event):
+        self.seeking = True
+
+    def end_seek(self, event):
+        self.seeking = False
+        if not self.duration_ms:
+            return
+
+        # Move the local clock now; the poll after the seek doesn't change
+        # track or play state, so it won't re-anchor it
+        position = self.progress_scale.get()
+        self.progress_anchor = (position, time.monotonic(), self.progress_anchor[2])
+        self.update_progress()
+        workers.submit(commands.seek, position)
 
     def load_and_resize_icon(self, path, width, height):
         image = Image.open(path)
         image = image.resize((width, height), Image.LANCZOS)
         return ImageTk.PhotoImage(image)
 
+    # The buttons repaint first and leave the API calls to the transport
+    # queue, which merges whatever is pressed while a request is out
+
     def play_music(self):
-        sp.start_playback()
+        transport.set_playing(True)
         self.update_button_state(play=True)
+        self.set_progress_playing(True)
         print("Playing music...")
 
     def pause_music(self):
-        sp.pause_playback()
+        transport.set_playing(False)
         self.update_button_state(play=False)
+        self.set_progress_playing(False)
         print("Pausing music...")
 
     def update_button_state(self, play):
@@ -339,73 +633,133 @@ class Page2(tk.Frame):
             self.button_play.grid()
 
     def skip_music(self):
-        sp.next_track()
-        self.update_album_art_and_song()
+        self.show_pending_skip(transport.skip(1))
         print("Skipping to next track...")
 
     def prev_music(self):
-        sp.previous_track()
-        self.update_album_art_and_song()
+        self.show_pending_skip(transport.skip(-1))
         print("Going to previous track...")
 
-    def update_album_art_and_song(self):
-        def fetch_album_art_and_song():
-            try:
-                current_track = sp.current_playback()
-                if current_track and current_track['item']:
-                    track_id = current_track['item']['id']
-                    if track_id != self.last_track_id:
-                        self.last_track_id = track_id
-                        track_name = current_track['item']['name']
-                        artist_name = current_track['item']['artists'][0]['name']
-                        self.song_label.config(text=f"{track_name} - {artist_name}")
-
-                        album_images = current_track['item']['album']['images']
-                        if album_images:
-                            album_art_url = album_images[0]['url']
-                            self.display_album_art(album_art_url)
-
-                    if current_track['is_playing']:
-                        self.update_button_state(play=True)
-                    else:
-                        self.update_button_state(play=False)
-                else:
-                    self.song_label.config(text="No music playing")
-                    self.album_art_label.config(image=self.placeholder_image)
-                    self.update_button_state(play=False)
-            except Exception as e:
-                print(f"Error updating album art and song: {e}")
+    def show_pending_skip(self, steps):
+        # Placeholder until the poll after the skip brings the new track.
+        # Going forward, the prefetched queue usually knows what it will be;
+        # count every step not yet seen in a poll, not just this batch's.
+        upcoming = None
+        if steps > 0:
+            current = playback_state.current()
+            current_uri = current['item'].get('uri') if current and current.get('item') else None
+            upcoming = prefetcher.upcoming_track(current_uri, transport.outstanding_steps() - 1)
+        if upcoming:
+            artists = upcoming.get('artists') or [{}]
+            self.song_label.config(text=f"{upcoming.get('name')} - {artists[0].get('name', '')}")
+            album_art_url = pick_image_url(images_of(upcoming), 250)
+            if album_art_url:
+                self.display_album_art(album_art_url)
+        elif steps > 0:
+            self.song_label.config(text=f"Skipping ahead {steps}...")
+        elif steps < 0:
+            self.song_label.config(text=f"Going back {-steps}...")
+
+        # If the skip fails there is no track change to replace it
+        if self.skip_label_after is not None:
+            self.after_cancel(self.skip_label_after)
+        self.skip_label_after = self.after(SKIP_LABEL_TIMEOUT_MS, self.restore_song_label)
+
+    def on_transport_failed(self, kind):
+        # The press was shown before it was sent; put the page back to the
+        # last known state, which the poll after a failure won't republish
+        if kind == 'skip':
+            if self.skip_label_after is not None:
+                self.after_cancel(self.skip_label_after)
+            self.restore_song_label()
+        elif transport.expected_playing() is None:
+            self.update_button_state(play=is_playing_of(playback_state.current()))
+            self.sync_progress()
+
+    def restore_song_label(self):
+        # Put back the current track's label and cover, in case the skip
+        # showed an upcoming track that never started
+        self.skip_label_after = None
+        current_track = playback_state.current()
+        self.show_song(current_track)
+        if current_track and current_track.get('item'):
+            album_art_url = pick_image_url(images_of(current_track['item']), 250)
+            if album_art_url:
+                self.display_album_art(album_art_url)
+        else:
+            self.album_art_url = None
+            self.album_art_label.config(image=self.placeholder_image)
+
+    def show_song(self, current_track):
+        if current_track and current_track.get('item'):
+            track_name = current_track['item']['name']
+            artist_name = current_track['item']['artists'][0]['name']
+            self.song_label.config(text=f"{track_name} - {artist_name}")
+        else:
+            self.song_label.config(text="No music playing")
+
+    def on_playback_change(self, current_track, changes):
+        if changes & {'track', 'is_playing', 'position'}:
+            self.sync_progress()
 
-        fetch_album_art_and_song()
+        try:
+            if current_track and current_track['item']:
+                if 'track' in changes:
+                    self.show_song(current_track)
+
+                    album_images = current_track['item']['album']['images']
+                    album_art_url = pick_image_url(album_images, 250)
+                    if album_art_url:
+                        self.display_album_art(album_art_url)
+
+                # Polls taken before a pending play/pause lands would flip the
+                # button back, so leave it as pressed until the queue is done
+                if 'is_playing' in changes and transport.expected_playing() is None:
+                    self.update_button_state(play=current_track['is_playing'])
+            elif 'track' in changes:
+                self.song_label.config(text="No music playing")
+                self.album_art_url = None
+                self.album_art_label.config(image=self.placeholder_image)
+                self.update_button_state(play=False)
+        except Exception as e:
+            print(f"Error updating album art and song: {e}")
 
     def display_album_art(self, url):
-        def fetch_album_art():
+        self.album_art_url = url
+
+        album_art_image = album_art_cache.get(url)
+        if album_art_image is not None:
+            self.show_album_art(album_art_image)
+            return
+
+        def fetch_album_art(task):
             try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                image_byt = response.content
-                image_open = Image.open(io.BytesIO(image_byt))
-                image_resized = image_open.resize((250, 250), Image.LANCZOS)
-                album_art_image = ImageTk.PhotoImage(image_resized)
-                self.album_art_label.config(image=album_art_image)
-                self.album_art_label.image = album_art_image
-            except requests.RequestException as e:
+                image = album_art_cache.fetch_image(url)
+            except (requests.RequestException, OSError) as e:
                 print(f"Error fetching album art: {e}")
+                return
 
-        threading.Thread(target=fetch_album_art).start()
+            ui.post(self.on_album_art_fetched, url, image)
+
+        workers.submit_latest('album_art', fetch_album_art)
+
+    def on_album_art_fetched(self, url, image):
+        album_art_image = album_art_cache.make_photo(url, image)
+        # The track may have changed again while this one was downloading
+        if self.album_art_url == url:
+            self.show_album_art(album_art_image)
+
+    def show_album_art(self, album_art_image):
+        self.album_art_label.config(image=album_art_image)
+        self.album_art_label.image = album_art_image
 
     def create_placeholder_image(self, width, height):
         placeholder = Image.new('RGB', (width, height), 'grey')
         return ImageTk.PhotoImage(placeholder)
 
-    def update_periodically(self):
-        self.update_album_art_and_song()
-        self.after(3000, self.update_periodically)
-
-class Page3(tk.Frame):
+class Page3(Page):
     def __init__(self, parent, controller):
-        tk.Frame.__init__(self, parent, bg='gray20')
-        self.controller = controller
+        Page.__init__(self, parent, controller)
 
         self.columnconfigure(0, weight=1)
         self.columnconfigure(1, weight=2)
@@ -449,136 +803,157 @@ class Page3(tk.Frame):
 
         self.playlist_tree.bind('<<TreeviewSelect>>', self.on_playlist_select)
 
-        columns = ("Track Name",)
-        self.track_tree = ttk.Treeview(track_frame, columns=columns, show='headings', style="Custom.Treeview")
-        self.track_tree.heading("Track Name", text="Track Name")
-        self.track_tree.column("Track Name", minwidth=0, width=300)
-        self.track_tree.pack(expand=True, fill='both', side='left')
-
-        self.track_scroll = ttk.Scrollbar(track_frame, orient="vertical", command=self.track_tree.yview)
-        self.track_tree.configure(yscrollcommand=self.track_scroll.set)
-        self.track_scroll.pack(side='right', fill='y')
-
-        self.track_tree.bind('<<TreeviewSelect>>', self.on_track_select)
+        # Only the visible rows exist as Tk items, so large playlists stay light
+        self.track_list = VirtualTrackList(track_frame, on_select=self.on_track_select, heading="Track Name", width=300)
+        # The open playlist tells the prefetcher what comes next when the
+        # Spotify queue can't
+        prefetcher.set_playlist_source(lambda: list(self.tracks_list))
+        self.track_list.pack(expand=True, fill='both')
 
         self.song_label = tk.Label(self, text="Currently Playing: Song Name - Artist", font=("Helvetica", 16), fg="grey", bg="gray20")
         self.song_label.grid(row=2, column=0, columnspan=2, pady=10, sticky="s")
 
+        self.current_playlist_id = None
+        self.shown_playlists = None
         self.load_playlists()
+        library_sync.subscribe(ui.wrap(self.on_library_change))
 
-        # Initialize the last track ID
-        self.last_track_id = None
-
-        # Update the song label periodically
-        self.update_song_label()
-        self.after(3000, self.update_periodically)
+        # Update the song label whenever the shared playback state changes
+        self.watch(playback_state, self.on_playback_change)
 
     def load_playlists(self):
-        def fetch_playlists():
-            try:
-                playlists = sp.current_user_playlists()
-                for playlist in playlists['items']:
-                    self.playlist_tree.insert("", "end", values=(playlist['name'],), tags=(playlist['id'],))
-            except Exception as e:
-                print(f"Error fetching playlists: {e}")
+        self.watch(playlist_repository, self.show_playlists)
+
+    def on_show(self):
+        refresh_stale_playlists()
 
-        threading.Thread(target=fetch_playlists).start()
+    def show_playlists(self, playlists):
+        # Re-subscribing on show replays the list; if nothing changed, keep
+        # the tree (and its selection and scroll position) as it is
+        if playlists == self.shown_playlists:
+            return
+        self.shown_playlists = playlists
+        show_playlists_in_tree(self.playlist_tree, playlists)
+
+    def on_library_change(self, kind, playlist_id):
+        if kind == 'tracks' and playlist_id == self.current_playlist_id:
+            self.load_tracks(playlist_id)
 
     def on_playlist_select(self, event):
-        selected_item = self.playlist_tree.selection()[0]
-        playlist_id = self.playlist_tree.item(selected_item, "tags")[0]
-        threading.Thread(target=self.load_tracks, args=(playlist_id,)).start()
+        selection = self.playlist_tree.selection()
+        if not selection:
+            return
+        playlist_id = self.playlist_tree.item(selection[0], "tags")[0]
+        self.load_tracks(playlist_id)
 
     def load_tracks(self, playlist_id):
-        def fetch_tracks():
+        # Latest selection wins: switching playlists cancels the previous load
+        self.clear_tracks()
+        self.current_playlist_id = playlist_id
+
+        self.track_load_started = time.perf_counter()
+        self.track_load_first_row = None
+
+        def fetch_tracks(task):
             try:
-                self.track_tree.delete(*self.track_tree.get_children())
-                self.tracks_list = []
-                offset = 0
-                limit = 100
-
-                while True:
-                    tracks = sp.playlist_tracks(playlist_id, offset=offset, limit=limit)
-                    if not tracks['items']:
-                        break
-                    
-                    for track in tracks['items']:
-                        if track['track'] is not None:
-                            track_uri = track['track']['uri']
-                            track_name = track['track']['name']
-                            artist_name = track['track']['artists'][0]['name']
-                            display_text = f"{track_name} - {artist_name}"
-                            self.tracks_list.append(track_uri)
-                            self.track_tree.insert("", "end", values=(display_text,), tags=(track_uri,))
-                    
-                    offset += len(tracks['items'])
-                    if len (tracks['items']) < limit:
-                        break
-
-                self.current_playlist_id = playlist_id
-                print(f"Total tracks loaded: {len(self.tracks_list)}")
+                # Served from the local index when it matches the playlist's snapshot_id
+                rows = library.current_tracks(playlist_id)
+                if rows is not None:
+                    ui.post(self.add_tracks, task, rows)
+                    ui.post(self.on_tracks_loaded, task, playlist_id, len(rows))
+                    return
+
+                snapshot_id = library.snapshot_id(playlist_id)
+                rows = []
+                # The user is waiting on these pages, so they go ahead of sync and polling
+                with user_initiated():
+                    for page_rows in fetch_playlist_tracks(sp, page_fetcher, playlist_id, task.is_cancelled):
+                        rows.extend(page_rows)
+                        ui.post(self.add_tracks, task, page_rows)
+
+                if task.is_cancelled():
+                    return
+
+                if snapshot_id is not None:
+                    library.replace_tracks(playlist_id, snapshot_id, rows)
+                ui.post(self.on_tracks_loaded, task, playlist_id, len(rows))
             except Exception as e:
                 print(f"Error fetching tracks: {e}")
 
-        threading.Thread(target=fetch_tracks).start()
-
-    def on_track_select(self, event):
-        selected_item = self.track_tree.selection()[0]
-        track_uri = self.track_tree.item(selected_item, "tags")[0]
-        self.play_track(track_uri)
+        workers.submit_latest('page3:tracks', fetch_tracks)
+
+    @property
+    def tracks_list(self):
+        return self.track_list.columns.uris
+
+    def clear_tracks(self):
+        self.track_list.clear()
+
+    def add_tracks(self, task, rows):
+        if task.is_cancelled():
+            return
+
+        self.track_list.extend(rows)
+
+        if rows and self.track_load_first_row is None:
+            self.track_load_first_row = time.perf_counter()
+
+    def on_tracks_loaded(self, task, playlist_id, track_count):
+        if task.is_cancelled():
+            return
+
+        # Time to first row and to completion, measured when the rows hit the tree
+        finished = time.perf_counter()
+        first_row_ms = ((self.track_load_first_row or finished) - self.track_load_started) * 1000
+        complete_ms = (finished - self.track_load_started) * 1000
+        self.track_load_metrics = {
+            'tracks': track_count,
+            'first_row_ms': first_row_ms,
+            'complete_ms': complete_ms,
+        }
+        print(f"Total tracks loaded: {track_count} (first row {first_row_ms:.0f} ms, complete {complete_ms:.0f} ms)")
+
+    def on_track_select(self, index):
+        columns = self.track_list.columns
+        self.play_track(columns.uris[index], columns.names[index], columns.artists[index])
+
+    def play_track(self, track_uri, track_name, artist_name):
+        # No active device in the last-known state: start the SDK player instead
+        if commands.active_device_id() is None:
+            self.launch_sdk_and_play(track_uri, track_name, artist_name)
+            return
+
+        playlist_uri = f"spotify:playlist:{self.current_playlist_id}"
+        workers.submit(commands.play_track, track_uri, context_uri=playlist_uri)
+        self.song_label.config(text=f"Currently Playing: {track_name} - {artist_name}")
+        print(f"Playing track {track_uri}...")
+
+    def launch_sdk_and_play(self, track_uri, track_name, artist_name):
+        # Launch the SDK in the web browser unless its player is already up
+        if not sdk_device.is_ready():
+            webbrowser.open('http://127.0.0.1:8888')
+
+        # Play as soon as the SDK device reports ready, without blocking the UI
+        def play_when_ready(task):
+            if commands.play_on_sdk(track_uri, is_cancelled=task.is_cancelled):
+                ui.post(self.song_label.config, text=f"Currently Playing: {track_name} - {artist_name}")
+                print(f"Playing track {track_uri} on SDK...")
+            elif not task.is_cancelled():
+                print("Timed out waiting for the Web Playback SDK player")
+
+        workers.submit_latest('sdk_play', play_when_ready)
+
+    def on_playback_change(self, current_track, changes):
+        if 'track' not in changes:
+            return
 
-    def play_track(self, track_uri):
-        current_track = sp.current_playback()
-        if not current_track or not current_track['is_playing']:
-            self.launch_sdk_and_play(track_uri)
-        else:
-            playlist_uri = f"spotify:playlist:{self.current_playlist_id}"
-            sp.start_playback(context_uri=playlist_uri, offset={"uri": track_uri})
-            track_info = sp.track(track_uri)
-            track_name = track_info['name']
-            artist_name = track_info['artists'][0]['name']
-            self.song_label.config(text=f"Currently Playing: {track_name} - {artist_name}")
-            print(f"Playing track {track_uri}...")
-
-    def launch_sdk_and_play(self, track_uri):
-        # Launch the SDK in the web browser
-        webbrowser.open('http://127.0.0.1:8888')
-        time.sleep(5)  # Give some time for the SDK to initialize
-
-        # Transfer playback to the SDK and play the track
-        device_id = self.get_sdk_device_id()
-        if device_id:
-            sp.transfer_playback(device_id)
-            sp.start_playback(uris=[track_uri])
-            track_info = sp.track(track_uri)
-            track_name = track_info['name']
-            artist_name = track_info['artists'][0]['name']
-            self.song_label.config(text=f"Currently Playing: {track_name} - {artist_name}")
-            print(f"Playing track {track_uri} on SDK...")
-
-    def get_sdk_device_id(self):
-        devices = sp.devices().get('devices', [])
-        for device in devices:
-            if device['name'] == 'Web Playback SDK Quick Start Player':
-                return device['id']
-        return None
-
-    def update_song_label(self):
-        current_track = sp.current_playback()
         if current_track and current_track['item']:
-            track_id = current_track['item']['id']
-            if track_id != self.last_track_id:
-                self.last_track_id = track_id
-                track_name = current_track['item']['name']
-                artist_name = current_track['item']['artists'][0]['name']
-                self.song_label.config(text=f"Currently Playing: {track_name} - {artist_name}")
+            track_name = current_track['item']['name']
+            artist_name = current_track['item']['artists'][0]['name']
+            self.song_label.config(text=f"Currently Playing: {track_name} - {artist_name}")
         else:
             self.song_label.config(text="Currently Playing: No music playing")
 
-    def update_periodically(self):
-        self.update_song_label()
-        self.after(3000, self.update_periodically)
-
 class PlaceholderEntry(tk.Entry):
     def __init__(self, master=None, placeholder="PLACEHOLDER", color='grey', *args, **kwargs):
         super().__init__(master, *args, **kwargs)
@@ -593,8 +968,12 @@ class PlaceholderEntry(tk.Entry):
         self.put_placeholder()
 
     def put_placeholder(self):
-        self.insert(0, self.placeholder)
+        # Colour first, so textvariable traces can already tell it is the placeholder
         self['fg'] = self.placeholder_color
+        self.insert(0, self.placeholder)
+
+    def is_placeholder(self):
+        return self['fg'] == self.placeholder_color
 
     def focus_in(self, *args):
         if self['fg'] == self.placeholder_color:
@@ -605,10 +984,9 @@ class PlaceholderEntry(tk.Entry):
         if not self.get():
             self.put_placeholder()
 
-class Page4(tk.Frame):
+class Page4(Page):
     def __init__(self, parent, controller):
-        tk.Frame.__init__(self, parent, bg='gray20')
-        self.controller = controller
+        Page.__init__(self, parent, controller)
 
         self.columnconfigure(0, weight=1)
         self.columnconfigure(1, weight=1)
@@ -619,8 +997,21 @@ class Page4(tk.Frame):
         self.rowconfigure(3, weight=1)
         self.rowconfigure(4, weight=1)
 
+        # Search state comes first: the entry's placeholder text writes
+        # search_var, and so runs on_search_changed, while it is being built
+        self.search_results = []
+        self.local_results = []
+        self.remote_results = []
+        self.selected_track_uri = None
+
+        self.search_after_id = None
+        self.deferred_query = None
+        self.search_keystrokes = 0
+        self.search_api_calls = 0
+
         self.search_var = tk.StringVar()
-        
+        self.search_var.trace_add('write', self.on_search_changed)
+
         self.search_label = tk.Label(self, text="Search for a Song", font=("Helvetica", 16), fg="grey", bg="gray20")
         self.search_label.grid(row=0, column=1, pady=10, sticky="n")
 
@@ -644,6 +1035,7 @@ class Page4(tk.Frame):
         self.playlist_tree.configure(yscrollcommand=self.playlist_scroll.set)
         self.playlist_scroll.grid(row=1, column=4, rowspan=3, sticky='ns')
 
+        self.shown_playlists = None
         self.load_playlists()
 
         self.btn_frame = tk.Frame(self, bg="gray20")
@@ -658,90 +1050,158 @@ class Page4(tk.Frame):
         self.results_tree.bind('<<TreeviewSelect>>', self.on_song_select)
         self.playlist_tree.bind('<<TreeviewSelect>>', self.on_playlist_select)
 
-        self.search_results = []
-        self.selected_track_uri = None
-
     def load_playlists(self):
-        def fetch_playlists():
-            try:
-                playlists = sp.current_user_playlists()
-                for playlist in playlists['items']:
-                    self.playlist_tree.insert("", "end", values=(playlist['name'],), tags=(playlist['id'],))
-            except Exception as e:
-                print(f"Error fetching playlists: {e}")
-
-        threading.Thread(target=fetch_playlists).start()
+        self.watch(playlist_repository, self.show_playlists)
+
+    def on_hide(self):
+        # Hold back a debounced remote search until the page is back
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
+            self.deferred_query = self.current_query()
+
+    def on_show(self):
+        refresh_stale_playlists()
+        if self.deferred_query:
+            self.search_after_id = self.after(SEARCH_DEBOUNCE_MS, self.fetch_remote_results, self.deferred_query)
+            self.deferred_query = None
+
+    def show_playlists(self, playlists):
+        # Re-subscribing on show replays the list; if nothing changed, keep
+        # the tree (and its selection and scroll position) as it is
+        if playlists == self.shown_playlists:
+            return
+        self.shown_playlists = playlists
+        show_playlists_in_tree(self.playlist_tree, playlists)
+
+    def current_query(self):
+        if not hasattr(self, 'search_entry') or self.search_entry.is_placeholder():
+            return ""
+        return self.search_var.get().strip()
+
+    def on_search_changed(self, *args):
+        # Local hits from the library index answer every keystroke straight away
+        query = self.current_query()
+        self.local_results = search_index.search(query, limit=20) if query else []
+        self.remote_results = []
+        self.show_results()
+
+        # Remote search waits until typing pauses; anything still in flight
+        # for an older prefix is abandoned
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        workers.cancel('search')
+
+        if not query:
+            return
+
+        self.search_keystrokes += 1
+        cached = remote_search_cache.get(query)
+        if cached is not None:
+            self.merge_remote_results(cached)
+        else:
+            self.search_after_id = self.after(SEARCH_DEBOUNCE_MS, self.fetch_remote_results, query)
 
     def search_song(self):
-        def fetch_songs():
-            query = self.search_var.get()
-            if query:
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
+
+        query = self.current_query()
+        if not query:
+            return
+
+        cached = remote_search_cache.get(query)
+        if cached is not None:
+            self.merge_remote_results(cached)
+        else:
+            self.fetch_remote_results(query)
+
+    def fetch_remote_results(self, query):
+        self.search_after_id = None
+        self.search_api_calls += 1
+
+        def fetch_songs(task):
+            with user_initiated():
                 results = sp.search(q=query, type="track", limit=20)
-                tracks = results.get('tracks', {}).get('items', [])
+            tracks = results.get('tracks', {}).get('items', [])
+            rows = [(track['uri'], track['name'], track['artists'][0]['name']) for track in tracks]
+            # Cached even if the user typed on, a later backspace can use it
+            remote_search_cache.put(query, rows)
+            ui.post(self.show_search_results, task, query, rows)
+
+        workers.submit_latest('search', fetch_songs)
 
-                for item in self.results_tree.get_children():
-                    self.results_tree.delete(item)
+        saved = self.search_keystrokes - self.search_api_calls
+        print(f"Search: {self.search_api_calls} API calls for {self.search_keystrokes} queries typed "
+              f"({saved} saved, {remote_search_cache.hits} served from cache)")
 
-                self.search_results = []
-                for track in tracks:
-                    track_name = track['name']
-                    artist_name = track['artists'][0]['name']
-                    self.results_tree.insert("", "end", values=(track_name, artist_name), tags=(track['uri'],))
-                    self.search_results.append(track)
+    def show_search_results(self, task, query, rows):
+        if task.is_cancelled() or query != self.current_query():
+            return
+        self.merge_remote_results(rows)
 
-        threading.Thread(target=fetch_songs).start()
+    def merge_remote_results(self, rows):
+        # Remote results go below the local hits, without repeating any of them
+        local_uris = {uri for uri, _, _ in self.local_results}
+        self.remote_results = [row for row in rows if row[0] not in local_uris]
+        self.show_results()
+
+    def show_results(self):
+        self.results_tree.delete(*self.results_tree.get_children())
+
+        self.search_results = self.local_results + self.remote_results
+        for track_uri, track_name, artist_name in self.search_results:
+            self.results_tree.insert("", "end", values=(track_name, artist_name), tags=(track_uri,))
 
     def on_song_select(self, event):
-        selected_item = self.results_tree.selection()[0]
-        track_uri = self.results_tree.item(selected_item, "tags")[0]
+        selection = self.results_tree.selection()
+        if not selection:
+            return
+        track_uri = self.results_tree.item(selection[0], "tags")[0]
         self.selected_track_uri = track_uri
         self.play_track(track_uri)
 
     def play_track(self, track_uri):
-        current_track = sp.current_playback()
-        if not current_track or not current_track['is_playing']:
+        # No active device in the last-known state: start the SDK player instead
+        if commands.active_device_id() is None:
             self.launch_sdk_and_play(track_uri)
-        else:
-            sp.start_playback(uris=[track_uri])
-            track_info = sp.track(track_uri)
-            track_name = track_info['name']
-            artist_name = track_info['artists'][0]['name']
-            print(f"Playing track {track_uri}...")
+            return
+
+        workers.submit(commands.play_track, track_uri)
+        print(f"Playing track {track_uri}...")
 
     def launch_sdk_and_play(self, track_uri):
-        # Launch the SDK in the web browser
-        webbrowser.open('http://127.0.0.1:8888')
-        time.sleep(5)  # Give some time for the SDK to initialize
-
-        # Transfer playback to the SDK and play the track
-        device_id = self.get_sdk_device_id()
-        if device_id:
-            sp.transfer_playback(device_id)
-            sp.start_playback(uris=[track_uri])
-            track_info = sp.track(track_uri)
-            track_name = track_info['name']
-            artist_name = track_info['artists'][0]['name']
-            print(f"Playing track {track_uri} on SDK...")
-
-    def get_sdk_device_id(self):
-        devices = sp.devices().get('devices', [])
-        for device in devices:
-            if device['name'] == 'Web Playback SDK Quick Start Player':
-                return device['id']
-        return None
+        # Launch the SDK in the web browser unless its player is already up
+        if not sdk_device.is_ready():
+            webbrowser.open('http://127.0.0.1:8888')
+
+        # Play as soon as the SDK device reports ready, without blocking the UI
+        def play_when_ready(task):
+            if commands.play_on_sdk(track_uri, is_cancelled=task.is_cancelled):
+                print(f"Playing track {track_uri} on SDK...")
+            elif not task.is_cancelled():
+                print("Timed out waiting for the Web Playback SDK player")
+
+        workers.submit_latest('sdk_play', play_when_ready)
 
     def on_playlist_select(self, event):
-        selected_item = self.playlist_tree.selection()[0]
-        playlist_id = self.playlist_tree.item(selected_item, "tags")[0]
+        selection = self.playlist_tree.selection()
+        if not selection:
+            return
+        playlist_id = self.playlist_tree.item(selection[0], "tags")[0]
         self.add_to_playlist(playlist_id)
 
     def add_to_playlist(self, playlist_id):
         if self.selected_track_uri:
-            sp.user_playlist_add_tracks(user=sp.current_user()['id'], playlist_id=playlist_id, tracks=[self.selected_track_uri])
+            workers.submit(commands.add_to_playlist, playlist_id, self.selected_track_uri)
             print(f"Added {self.selected_track_uri} to playlist {playlist_id}.")
 
-def startTkinter():
-    app = MultiPageApp()
+startup_timer.mark('import')
+
+def startTkinter(login=None):
+    app = MultiPageApp(login=login)
     app.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+import threading
+import time
+
+
+class TokenManager:
+    # One OAuth token shared by the Tk app (as the spotipy auth_manager) and the
+    # Flask app (for the web player). A background thread refreshes it
+    # refresh_margin seconds before it expires, so callers get the current
+    # token straight away instead of stalling on a refresh mid-session.
+    def __init__(self, oauth, refresh_margin=300, retry_interval=30):
+        self.oauth = oauth
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.token_info = None
+        self.condition = threading.Condition()
+        self.refresh_lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.thread = None
+
+    def start(self, login=None):
+        # login() is called on the background thread when there is no cached
+        # token; it defaults to spotipy's interactive authorize()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, args=(login or self.authorize,), daemon=True)
+            self.thread.start()
+
+    def load_cached(self):
+        token_info = self.oauth.validate_token(self.oauth.cache_handler.get_cached_token())
+        if token_info:
+            self.set_token(token_info)
+        return token_info
+
+    def authorize(self):
+        # Interactive fallback: spotipy opens the browser and waits for the redirect
+        self.set_token(self.oauth.get_access_token(as_dict=True))
+
+    def exchange_code(self, code):
+        # Authorization code from the Flask /callback route
+        self.set_token(self.oauth.get_access_token(code, as_dict=True, check_cache=False))
+
+    def set_token(self, token_info):
+        with self.condition:
+            self.token_info = token_info
+            self.condition.notify_all()
+        # Reschedule the refresh for the new expiry
+        self.wake_event.set()
+
+    def current(self):
+        # The token as it is now, or None; never blocks
+        with self.condition:
+            return self.token_info
+
+    def expires_in(self, token_info):
+        return token_info.get('expires_at', 0) - time.time()
+
+    def get_access_token(self, as_dict=False, timeout=None):
+        # spotipy's auth_manager interface. Only waits before the first token
+        # exists, or if the background refresh has somehow fallen behind.
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.token_info is not None, timeout):
+                raise TimeoutError("No Spotify access token available yet")
+            token_info = self.token_info
+
+        if self.expires_in(token_info) < 10:
+            token_info = self.refresh(token_info)
+
+        return token_info if as_dict else token_info['access_token']
+
+    def refresh(self, stale_token_info):
+        with self.refresh_lock:
+            # Another thread may have refreshed while we waited for the lock
+            token_info = self.current()
+            if token_info is not stale_token_info:
+                return token_info
+
+            token_info = self.oauth.refresh_access_token(stale_token_info['refresh_token'])
+            self.set_token(token_info)
+            print("Refreshed Spotify access token")
+            return token_info
+
+    def sign_in(self, login):
+        try:
+            if self.current() is None and not self.load_cached():
+                login()
+        except Exception as e:
+            print(f"Error signing in to Spotify: {e}")
+
+    def run(self, login):
+        self.sign_in(login)
+        while True:
+            token_info = self.current()
+            if token_info is None:
+                self.wake_event.wait()
+                self.wake_event.clear()
+                continue
+
+            delay = self.expires_in(token_info) - self.refresh_margin
+            if delay > 0 and self.wake_event.wait(delay):
+                # New token arrived; recompute the schedule for it
+                self.wake_event.clear()
+                continue
+
+            try:
+                self.refresh(token_info)
+            except Exception as e:
+                print(f"Error refreshing access token: {e}")
+                self.wake_event.wait(self.retry_interval)
+            self.wake_event.clear()
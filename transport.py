@@ -0,0 +1,166 @@
+import threading
+
+from playback_state import is_playing_of
+
+
+class TransportQueue:
+    # Play/pause/next/previous presses from the UI. A press only records what
+    # the user wants and returns, so the page can repaint straight away; one
+    # background thread sends the net result. Presses that arrive while a
+    # request is out, or within `settle` seconds of each other, are folded
+    # together: five quick skips become one step of +5, and pause-then-play
+    # before anything is sent cancels out.
+    def __init__(self, commands, playback_state, settle=0.2, jump_threshold=3):
+        self.commands = commands
+        self.playback_state = playback_state
+        self.settle = settle
+        # From this many steps ahead, jump through the queue with one
+        # start_playback instead of calling next_track for each step
+        self.jump_threshold = jump_threshold
+        self.condition = threading.Condition()
+        self.steps = 0
+        self.wanted_playing = None
+        self.sending_playing = None
+        self.sending_steps = 0
+        # Steps sent whose track change hasn't been seen in a poll yet
+        self.unseen_steps = 0
+        self.playing = None
+        self.presses = 0
+        self.subscribers = []
+        self.thread = None
+        playback_state.subscribe(self.on_playback_change)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def on_playback_change(self, snapshot, changes):
+        # Polls only overrule our idea of the play state when nothing we sent
+        # or are about to send could still be on its way
+        with self.condition:
+            if self.wanted_playing is None and self.sending_playing is None:
+                self.playing = is_playing_of(snapshot)
+            if 'track' in changes:
+                self.unseen_steps = 0
+
+    def set_playing(self, playing):
+        with self.condition:
+            self.wanted_playing = playing
+            self.presses += 1
+            self.condition.notify()
+
+    def skip(self, steps=1):
+        # Negative steps go back. Returns the net steps still waiting to be sent.
+        with self.condition:
+            self.steps += steps
+            self.presses += 1
+            self.condition.notify()
+            return self.steps
+
+    def outstanding_steps(self):
+        # How far from the last polled track playback is headed: pressed,
+        # being sent, and sent but not yet seen in a poll
+        with self.condition:
+            return self.steps + self.sending_steps + self.unseen_steps
+
+    def expected_playing(self):
+        # The play state the UI should show while commands are pending, else None
+        with self.condition:
+            if self.wanted_playing is not None:
+                return self.wanted_playing
+            return self.sending_playing
+
+    def has_work(self):
+        return self.steps != 0 or self.wanted_playing is not None
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.has_work():
+                    self.condition.wait()
+                # Wait for the presses to stop before deciding what to send
+                presses = None
+                while presses != self.presses:
+                    presses = self.presses
+                    self.condition.wait(self.settle)
+                steps, self.steps = self.steps, 0
+                playing, self.wanted_playing = self.wanted_playing, None
+                # A toggle that ends where it started needs no request
+                if playing == self.playing:
+                    playing = None
+                self.sending_playing = playing
+                self.sending_steps = steps
+
+            # What the UI already shows optimistically and has to undo if
+            # the request fails; the poll afterwards may well see no change
+            unsent = ['playing'] if playing is not None else []
+            if steps:
+                unsent.append('skip')
+            try:
+                if playing is not None:
+                    self.commands.call('start_playback' if playing else 'pause_playback')
+                    unsent.remove('playing')
+                    with self.condition:
+                        self.playing = playing
+                if steps:
+                    self.step(steps)
+                    unsent.remove('skip')
+                    with self.condition:
+                        self.unseen_steps += steps
+            except Exception as e:
+                print(f"Error sending playback command: {e}")
+            finally:
+                with self.condition:
+                    self.sending_playing = None
+                    self.sending_steps = 0
+                    if 'playing' in unsent:
+                        self.playing = is_playing_of(self.playback_state.current())
+
+            for kind in unsent:
+                self.notify_failed(kind)
+            self.playback_state.poll_now()
+
+    def subscribe(self, callback):
+        # callback(kind) when a 'playing' or 'skip' request could not be sent
+        with self.condition:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.condition:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def notify_failed(self, kind):
+        with self.condition:
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try:
+                callback(kind)
+            except Exception as e:
+                print(f"Error in transport subscriber: {e}")
+
+    def step(self, steps):
+        if steps >= self.jump_threshold and self.jump_ahead(steps):
+            return
+        name = 'next_track' if steps > 0 else 'previous_track'
+        for _ in range(abs(steps)):
+            self.commands.call(name)
+
+    def jump_ahead(self, steps):
+        # Start the context at the track `steps` places ahead in the queue,
+        # which keeps the playlist/album playing from there
+        snapshot = self.playback_state.current()
+        context = (snapshot or {}).get('context') or {}
+        if not context.get('uri'):
+            return False
+        try:
+            upcoming = self.commands.call('queue').get('queue', [])
+            if len(upcoming) < steps:
+                return False
+            self.commands.call('start_playback', context_uri=context['uri'],
+                               offset={'uri': upcoming[steps - 1]['uri']})
+            return True
+        except Exception as e:
+            print(f"Error jumping ahead {steps} tracks: {e}")
+            return False
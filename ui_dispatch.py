@@ -0,0 +1,65 @@
+import queue
+import time
+import tkinter as tk
+
+
+class UIDispatcher:
+    # Tk widgets may only be touched from the main thread. Worker threads post
+    # callables here and the main loop drains them in batches via after(),
+    # stopping once the per-frame budget is spent so input stays responsive.
+    # While nothing is posted the checks back off from idle_interval_ms to
+    # max_idle_interval_ms, so an idle kiosk wakes a few times a second
+    # rather than twenty.
+    def __init__(self, idle_interval_ms=50, max_idle_interval_ms=250, budget_ms=8):
+        self.idle_interval_ms = idle_interval_ms
+        self.max_idle_interval_ms = max_idle_interval_ms
+        self.idle_delay = idle_interval_ms
+        self.budget = budget_ms / 1000
+        self.queue = queue.Queue()
+        self.root = None
+
+    def attach(self, root):
+        self.root = root
+        self.root.after(0, self.drain)
+
+    def post(self, func, *args, **kwargs):
+        self.queue.put((func, args, kwargs))
+        # Back to quick checks; the drain already scheduled still runs at
+        # the old delay, at most max_idle_interval_ms away
+        self.idle_delay = self.idle_interval_ms
+
+    def wrap(self, func):
+        # Turns a main-thread callback into one that can be called from any thread
+        def post_to_ui(*args, **kwargs):
+            self.post(func, *args, **kwargs)
+        return post_to_ui
+
+    def drain(self):
+        deadline = time.perf_counter() + self.budget
+        handled = 0
+        while time.perf_counter() < deadline:
+            try:
+                func, args, kwargs = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            handled += 1
+
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Error in UI update: {e}")
+
+        # Come straight back if the budget ran out with work still queued,
+        # otherwise check less and less often while the queue stays empty
+        if not self.queue.empty():
+            delay = 1
+        elif handled:
+            delay = self.idle_delay = self.idle_interval_ms
+        else:
+            delay = self.idle_delay
+            self.idle_delay = min(self.max_idle_interval_ms, self.idle_delay * 2)
+        try:
+            self.root.after(delay, self.drain)
+        except tk.TclError:
+            # The window has been destroyed
+            pass
@@ -0,0 +1,176 @@
+import sys
+import tkinter as tk
+from tkinter import ttk
+
+
+class TrackColumns:
+    # Compact column store for a track list: one list per field rather than a
+    # dict (and a Tk item) per track. Artist names repeat a lot, so intern them.
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.uris = []
+        self.names = []
+        self.artists = []
+
+    def append(self, uri, name, artist):
+        self.uris.append(uri)
+        self.names.append(name)
+        self.artists.append(sys.intern(artist))
+
+    def __len__(self):
+        return len(self.uris)
+
+    def display_text(self, index):
+        return f"{self.names[index]} - {self.artists[index]}"
+
+
+class VirtualTrackList(tk.Frame):
+    # Track list that only creates Treeview rows for the visible window plus a
+    # little overscan, however many tracks are loaded. Scrolling moves the
+    # window over the column store and rewrites the existing rows in place.
+    def __init__(self, parent, on_select, heading="Track Name", width=300,
+                 row_height=30, overscan=2, style="Custom.Treeview"):
+        tk.Frame.__init__(self, parent, bg='gray20')
+        self.columns = TrackColumns()
+        self.on_select = on_select
+        self.row_height = row_height
+        self.overscan = overscan
+        self.top = 0
+        self.visible_rows = 1
+        self.selected_index = None
+        self.row_ids = []
+
+        self.tree = ttk.Treeview(self, columns=(heading,), show='headings', style=style, selectmode='browse')
+        self.tree.heading(heading, text=heading)
+        self.tree.column(heading, minwidth=0, width=width)
+        self.tree.pack(expand=True, fill='both', side='left')
+
+        self.scroll = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scroll.pack(side='right', fill='y')
+
+        self.tree.bind('<<TreeviewSelect>>', self.on_tree_select)
+        self.tree.bind('<Configure>', self.on_resize)
+        # Each handler returns "break" so Treeview's own bindings don't also
+        # scroll or move within the few real rows, out of step with self.top
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll_rows(-3) or "break")
+        self.tree.bind('<Button-5>', lambda event: self.scroll_rows(3) or "break")
+        self.tree.bind('<Up>', lambda event: self.move_selection(-1))
+        self.tree.bind('<Down>', lambda event: self.move_selection(1))
+        self.tree.bind('<Prior>', lambda event: self.move_selection(-self.visible_rows))
+        self.tree.bind('<Next>', lambda event: self.move_selection(self.visible_rows))
+
+    def clear(self):
+        self.columns.clear()
+        self.top = 0
+        self.selected_index = None
+        self.render()
+
+    def extend(self, rows):
+        # rows are (uri, name, artist) tuples
+        for uri, name, artist in rows:
+            self.columns.append(uri, name, artist)
+
+        # Once the window is full, new rows below it only move the scrollbar
+        if len(self.row_ids) < self.visible_rows + self.overscan:
+            self.render()
+        else:
+            self.update_scrollbar()
+
+    def max_top(self):
+        return max(0, len(self.columns) - self.visible_rows)
+
+    def scroll_to(self, top):
+        top = max(0, min(int(top), self.max_top()))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def scroll_rows(self, rows):
+        self.scroll_to(self.top + rows)
+
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * len(self.columns))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.visible_rows
+            self.scroll_rows(amount)
+
+    def on_mousewheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def move_selection(self, rows):
+        # Keyboard navigation over the whole list, scrolling the window when
+        # the selection reaches its edge
+        if not len(self.columns):
+            return "break"
+
+        if self.selected_index is None:
+            index = self.top
+        else:
+            index = max(0, min(self.selected_index + rows, len(self.columns) - 1))
+        if index < self.top:
+            self.scroll_to(index)
+        elif index >= self.top + self.visible_rows:
+            self.scroll_to(index - self.visible_rows + 1)
+
+        row_id = self.row_ids[index - self.top]
+        self.tree.focus(row_id)
+        self.tree.selection_set(row_id)
+        return "break"
+
+    def on_resize(self, event):
+        # The heading takes roughly one row of the tree's height
+        visible_rows = max(1, event.height // self.row_height - 1)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.top = min(self.top, self.max_top())
+            self.render()
+
+    def render(self):
+        count = max(0, min(self.visible_rows + self.overscan, len(self.columns) - self.top))
+
+        while len(self.row_ids) < count:
+            self.row_ids.append(self.tree.insert("", "end", values=("",)))
+        while len(self.row_ids) > count:
+            self.tree.delete(self.row_ids.pop())
+
+        for offset, row_id in enumerate(self.row_ids):
+            self.tree.item(row_id, values=(self.columns.display_text(self.top + offset),))
+
+        # Keep the selection on the same track as the window moves
+        selected = self.selected_index
+        if selected is not None and self.top <= selected < self.top + count:
+            row_id = self.row_ids[selected - self.top]
+            if self.tree.selection() != (row_id,):
+                self.tree.selection_set(row_id)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        self.tree.yview_moveto(0)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = len(self.columns)
+        if total == 0:
+            self.scroll.set(0, 1)
+        else:
+            self.scroll.set(self.top / total, min(1, (self.top + self.visible_rows) / total))
+
+    def on_tree_select(self, event):
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.row_ids:
+            return
+
+        index = self.top + self.row_ids.index(selection[0])
+        # Re-selecting the same track while the window scrolls is not a new pick
+        if index == self.selected_index:
+            return
+
+        self.selected_index = index
+        self.on_select(index)
@@ -0,0 +1,75 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Task:
+    # Handle for a submitted job. Cancellation is cooperative: long-running
+    # jobs check is_cancelled() between steps, and UI callbacks check it
+    # before applying results so stale work never reaches the widgets.
+    def __init__(self, key=None):
+        self.key = key
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def is_cancelled(self):
+        return self.cancelled.is_set()
+
+
+class WorkerPool:
+    # Fixed-size pool shared by every page. Jobs submitted under a key follow
+    # "latest wins": submitting a new job for a key cancels the previous one.
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='spotipi-worker')
+        self.lock = threading.Lock()
+        self.latest = {}
+
+    def submit(self, func, *args, **kwargs):
+        task = Task()
+        task.future = self.executor.submit(self.run, task, func, args, kwargs)
+        return task
+
+    def submit_latest(self, key, func, *args, **kwargs):
+        # func is called as func(task, *args, **kwargs)
+        task = Task(key)
+        with self.lock:
+            previous = self.latest.get(key)
+            self.latest[key] = task
+        if previous is not None:
+            previous.cancel()
+
+        task.future = self.executor.submit(self.run, task, func, (task,) + args, kwargs)
+        return task
+
+    def cancel(self, key):
+        with self.lock:
+            task = self.latest.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def run(self, task, func, args, kwargs):
+        if task.is_cancelled():
+            return None
+
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            print(f"Error in background task {task.key or func.__name__}: {e}")
+        finally:
+            if task.key is not None:
+                with self.lock:
+                    if self.latest.get(task.key) is task:
+                        del self.latest[task.key]
+
+    def shutdown(self):
+        with self.lock:
+            tasks = list(self.latest.values())
+            self.latest.clear()
+        for task in tasks:
+            task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)